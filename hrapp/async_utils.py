@@ -0,0 +1,94 @@
+# hrapp/async_utils.py
+"""
+Executors for the async views.
+
+Blocking network calls (imaplib, smtplib, Celery's broker client) run on a
+wide I/O pool and CPU-bound parsing and scoring on a pool sized to the
+machine, so a single ASGI worker keeps serving other requests while one
+recruiter's search is in flight.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+_io_executor = None
+_cpu_executor = None
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'ASYNC_IO_WORKERS', 64),
+            thread_name_prefix='hrapp-io'
+        )
+    return _io_executor
+
+
+def _get_cpu_executor() -> ThreadPoolExecutor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'ASYNC_CPU_WORKERS', None) or os.cpu_count() or 4,
+            thread_name_prefix='hrapp-cpu'
+        )
+    return _cpu_executor
+
+
+def _closing_connections(func, *args, **kwargs):
+    # Pool threads outlive the request, so don't leave DB connections open in them
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connections.close_all()
+
+
+async def run_io(func, *args, **kwargs):
+    """Await blocking network I/O (and any ORM work it does) on the I/O pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_io_executor(), functools.partial(_closing_connections, func, *args, **kwargs)
+    )
+
+
+async def run_cpu(func, *args, **kwargs):
+    """Await CPU-bound parsing or scoring on the CPU pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_cpu_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _finish_stream(iterator) -> None:
+    try:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
+    finally:
+        connections.close_all()
+
+
+async def aiter_blocking(iterable):
+    """
+    Async iterator over a blocking one, for streamed responses. Under ASGI
+    Django buffers a sync streaming body whole (sync_to_async(list)) before
+    sending a byte; this hands it over item by item instead. Every step runs
+    on one thread of its own, so a DB cursor the iterable opens stays on
+    the thread that opened it.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hrapp-stream')
+    done = object()
+    iterator = None
+    try:
+        iterator = await loop.run_in_executor(executor, iter, iterable)
+        while True:
+            item = await loop.run_in_executor(executor, next, iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        await loop.run_in_executor(executor, _finish_stream, iterator)
+        executor.shutdown(wait=False)
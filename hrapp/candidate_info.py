@@ -0,0 +1,128 @@
+# hrapp/candidate_info.py
+"""
+Single-pass candidate field extraction.
+
+`extract_candidate_fields` returns the same fields as the individual
+extract_* helpers in hrapp.utils, but splits the text into lines once,
+uses module-level precompiled patterns and avoids the lazy `[\\s\\S]*?`
+scans that can backtrack across a whole document.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from .work_history import total_experience_years
+
+NAME_STOPWORDS = ('resume', 'cv', 'vitae')
+
+NAME_LABEL_RE = re.compile(r'(?i)(?:name|full name)[:\s]*(.*?)\n')
+EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+(?:\.[\w]+)+')
+PHONE_RES = (
+    re.compile(r'(?:(?:\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})'),  # US/CA
+    re.compile(r'(?:(?:\+?\d{4}[-.\s]?){2,4})'),  # International
+)
+
+# "experience ... N years" is matched as: first section keyword, then the
+# first "N years" after it, which is what the lazy pattern did but linear
+EXPERIENCE_KEYWORD_RE = re.compile(r'experience|work history|employment', re.IGNORECASE)
+YEARS_RE = re.compile(r'(\d+)\s*(?:years?|yrs?)', re.IGNORECASE)
+EXPERIENCE_PLUS_RE = re.compile(r'(\d+)\s*\+\s*years?\s*experience', re.IGNORECASE)
+TOTAL_EXPERIENCE_RE = re.compile(r'total experience.*?(\d+)', re.IGNORECASE)
+
+SKILLS_SECTION_RE = re.compile(
+    r'(?:technical )?skills(?:\:)?\s*([\s\S]*?)(?:\n\n|\Z|experience|work history)',
+    re.IGNORECASE
+)
+SKILL_SPLIT_RE = re.compile(r'[,•·\-—]')
+
+# One alternation instead of a regex per degree per line
+DEGREE_RE = re.compile(r'\b(?:phd|mba|master|bachelor|bs|ms|ph\.d|b\.tech|m\.tech|bsc|msc)\b')
+
+
+def extract_candidate_fields(text: str) -> Dict[str, Any]:
+    """
+    Extract structured candidate information from resume text in one pass
+
+    Returns:
+        {
+            'name': str,
+            'email': Optional[str],
+            'phone': Optional[str],
+            'experience': float,
+            'skills': List[str],
+            'education': List[str]
+        }
+    """
+    lines = [line.strip() for line in text.split('\n')]
+    return {
+        'name': _name(text, lines),
+        'email': _email(text),
+        'phone': _phone(text),
+        'experience': _total_experience(text),
+        'skills': _skills_section(text),
+        'education': _education(text, lines)
+    }
+
+
+def _name(text: str, lines: List[str]) -> str:
+    # Method 1: First line that looks like a name
+    first_non_empty = None
+    for line in lines:
+        if first_non_empty is None and line:
+            first_non_empty = line
+        if (2 <= len(line.split()) <= 3 and
+                line.istitle() and
+                not any(word in line.lower() for word in NAME_STOPWORDS)):
+            return line
+
+    # Method 2: Look for "Name:" pattern
+    if match := NAME_LABEL_RE.search(text):
+        return match.group(1).strip()
+
+    # Method 3: First non-empty line
+    return first_non_empty or "Unknown Candidate"
+
+
+def _email(text: str) -> Optional[str]:
+    if match := EMAIL_RE.search(text):
+        return match.group(0)
+    return None
+
+
+def _phone(text: str) -> Optional[str]:
+    for pattern in PHONE_RES:
+        if match := pattern.search(text):
+            return match.group(0)
+    return None
+
+
+def _total_experience(text: str) -> float:
+    # First try explicit experience mentions
+    if keyword := EXPERIENCE_KEYWORD_RE.search(text):
+        if match := YEARS_RE.search(text, keyword.end()):
+            return float(match.group(1))
+    for pattern in (EXPERIENCE_PLUS_RE, TOTAL_EXPERIENCE_RE):
+        if match := pattern.search(text):
+            return float(match.group(1))
+
+    # Fallback: Parse work history dates (union of all employment periods)
+    return total_experience_years(text)
+
+
+def _skills_section(text: str) -> List[str]:
+    if match := SKILLS_SECTION_RE.search(text):
+        return list(set(
+            skill.strip()
+            for skill in SKILL_SPLIT_RE.split(match.group(1))
+            if skill.strip()
+        ))
+    return []
+
+
+def _education(text: str, lines: List[str]) -> List[str]:
+    found = []
+    for raw_line, line in zip(text.lower().split('\n'), lines):
+        if DEGREE_RE.search(raw_line):
+            found.append(line)
+            if len(found) == 3:  # Return max 3 most relevant
+                break
+    return found
@@ -0,0 +1,82 @@
+# hrapp/cascade.py
+"""
+Cascade scoring: deterministic score first, LLM only near the cutoff.
+
+The ATS score is skills (50) + experience (30) + title (20) and is the
+score every result is ranked and shown by; the LLM never changes it, and
+the cascade never drops a result. All it decides is whether a resume's
+candidate fields are worth an LLM call: only the experience part of the
+score depends on how many years a resume is read as, so the cheap score
+gives bounds on the score an LLM reading could produce, and
+
+  * resumes whose upper bound is below the cutoff (reject) or whose lower
+    bound reaches it (accept) use their cached profile,
+  * the rest are sent to the LLM (refine) only when their cheap score is
+    within CASCADE_UNCERTAINTY_BAND points of the cutoff; further out the
+    cheap score decides and the cached profile is used.
+
+The cutoff is JobRequirement.min_score for the searched position, or 0 when
+it has none, in which case every resume is accepted without an LLM call.
+"""
+import logging
+
+from django.conf import settings
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ACCEPT = 'accept'
+REJECT = 'reject'
+REFINE = 'refine'
+
+EXPERIENCE_POINTS = 30
+
+CASCADE_DECISIONS = REGISTRY.counter(
+    'hrmatcher_cascade_decisions_total',
+    'Resumes decided by the cheap score (accept/reject) or sent to the LLM (refine)',
+    ['decision']
+)
+
+
+def experience_points(years: float, min_experience: float) -> float:
+    """Experience part of the ATS score"""
+    return min(EXPERIENCE_POINTS, (years / min_experience) * EXPERIENCE_POINTS) if min_experience > 0 else 0
+
+
+class ScoreCascade:
+    """Accept/reject/refine decisions for one search"""
+
+    def __init__(self, cutoff: float = 0.0, min_experience: float = 0, band: float = None):
+        self.cutoff = cutoff
+        self.min_experience = min_experience
+        self.band = getattr(settings, 'CASCADE_UNCERTAINTY_BAND', 10.0) if band is None else band
+
+    def bounds(self, scores: dict):
+        """Lowest and highest score the LLM's experience figure could produce"""
+        base = scores['total_score'] - scores['experience_match']
+        return base, base + (EXPERIENCE_POINTS if self.min_experience > 0 else 0)
+
+    def decide(self, scores: dict) -> str:
+        low, high = self.bounds(scores)
+        if high < self.cutoff:
+            decision = REJECT
+        elif low >= self.cutoff:
+            decision = ACCEPT
+        elif abs(scores['total_score'] - self.cutoff) <= self.band:
+            decision = REFINE
+        else:
+            decision = ACCEPT if scores['total_score'] >= self.cutoff else REJECT
+        CASCADE_DECISIONS.inc(decision=decision)
+        return decision
+
+
+def search_cutoff(position: str = '') -> float:
+    """min_score of the latest JobRequirement for `position`, else 0"""
+    from .models import JobRequirement
+    job = None
+    if position:
+        job = JobRequirement.objects.filter(position__iexact=position.strip()).order_by('-id').first()
+    if job is not None and job.min_score:
+        return job.min_score
+    return 0.0
@@ -0,0 +1,198 @@
+# hrapp/catalog.py
+"""
+Resume catalog and sharded storage.
+
+Every stored resume has one ResumeDocument row, owned by the recruiter
+whose mailbox it came from, and lives at
+
+    MEDIA_ROOT/resumes/user_<id>/<sha[0:2]>/<sha[2:4]>/<sha><ext>
+
+so no directory grows past a few hundred entries and listing, filtering
+or expiring resumes is a database query instead of an os.listdir/stat
+walk over the whole store. Searches, de-duplication and the text cache
+(hrapp.text_cache) are scoped to one user's partition, so their cost
+follows that user's corpus rather than the whole installation.
+
+Attachments go through `ResumeIngest.store`, which skips bytes that are
+already stored and links near-duplicates (same CV re-saved under another
+name or sent by someone else) to the document they copy, so matching only
+scores the canonical file of each group. Files from the old flat layout
+are moved in with the shard_resumes management command.
+"""
+import logging
+import os
+from typing import Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from .dedup import SimHashIndex, from_signed64, sha256_bytes, sha256_file, simhash, to_signed64
+from .models import ResumeDocument
+from .text_cache import get_resume_text
+from .text_store import get_text_store
+
+logger = logging.getLogger(__name__)
+
+RESUME_EXTENSIONS = ('.pdf', '.docx')
+
+
+def resume_dir() -> str:
+    return os.path.join(settings.MEDIA_ROOT, 'resumes')
+
+
+def partition_prefix(user_id=None) -> str:
+    """Storage prefix for one user's resumes (documents without an owner predate partitioning)"""
+    return f'resumes/user_{user_id}' if user_id else 'resumes'
+
+
+def shard_path(digest: str, filename: str, user_id=None) -> str:
+    """Storage path, relative to MEDIA_ROOT, for content with this SHA-256"""
+    ext = os.path.splitext(filename)[1].lower()
+    return '/'.join((partition_prefix(user_id), digest[:2], digest[2:4], f"{digest}{ext}"))
+
+
+def absolute_path(relative_path: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, *relative_path.split('/'))
+
+
+def resume_url(document: ResumeDocument) -> str:
+    return f"{settings.MEDIA_URL.rstrip('/')}/{document.path}"
+
+
+def iter_resumes(user_id=None, extensions=RESUME_EXTENSIONS, include_duplicates: bool = False,
+                 older_than=None, all_users: bool = False, chunk_size: int = 2000) -> Iterator[ResumeDocument]:
+    """One user's catalogued resumes (every user's with all_users=True), without touching the filesystem"""
+    if user_id is None and not all_users:
+        # Ownerless rows are left over from before partitioning; nobody searches them
+        raise ValueError("iter_resumes needs a user_id (or all_users=True)")
+    documents = ResumeDocument.objects.all()
+    if not all_users:
+        documents = documents.filter(user_id=user_id)
+    if not include_duplicates:
+        documents = documents.filter(duplicate_of__isnull=True)
+    if extensions:
+        by_extension = Q()
+        for ext in extensions:
+            by_extension |= Q(path__endswith=ext)
+        documents = documents.filter(by_extension)
+    if older_than is not None:
+        documents = documents.filter(created_at__lt=older_than)
+    return documents.order_by('id').iterator(chunk_size=chunk_size)
+
+
+def load_simhash_index(user_id=None) -> SimHashIndex:
+    """Index of one user's canonical documents' SimHashes, keyed by document id"""
+    index = SimHashIndex()
+    canonical = ResumeDocument.objects.filter(user_id=user_id, duplicate_of__isnull=True, simhash__isnull=False)
+    for doc_id, value in canonical.values_list('id', 'simhash').iterator(chunk_size=5000):
+        index.add(doc_id, from_signed64(value))
+    return index
+
+
+class ResumeIngest:
+    """Stores one user's resumes for a fetch run, loading their SimHash index once"""
+
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+        self._index = None
+
+    @property
+    def index(self) -> SimHashIndex:
+        if self._index is None:
+            self._index = load_simhash_index(self.user_id)
+        return self._index
+
+    def link(self, document: ResumeDocument) -> ResumeDocument:
+        """Compute the document's SimHash and point it at an earlier near-duplicate"""
+        # Extracting here also fills the text cache and text store for the first search
+        text = get_resume_text(document)
+        if not text:
+            return document
+        get_text_store(self.user_id).append(document.sha256, text)
+        value = simhash(text)
+        document.simhash = to_signed64(value)
+        original_id = self.index.find(value)
+        if original_id is not None and original_id != document.id:
+            document.duplicate_of_id = original_id
+            logger.info(f"{document.filename} is a near-duplicate of document {original_id}")
+        else:
+            self.index.add(document.id, value)
+        document.save(update_fields=['simhash', 'duplicate_of'])
+        return document
+
+    def store(self, data: bytes, filename: str, sender_email: str = '',
+              link: bool = True) -> Tuple[ResumeDocument, bool]:
+        """
+        Save an attachment unless the same bytes are stored already. Returns
+        (document, created). With link=False text extraction and
+        near-duplicate linking are left to a later `link` call (the
+        ingest_user_resumes task), keeping mailbox syncs I/O-bound.
+        """
+        digest = sha256_bytes(data)
+        existing = ResumeDocument.objects.filter(user_id=self.user_id, sha256=digest).first()
+        if existing is not None:
+            return existing, False
+
+        relative_path = shard_path(digest, filename, self.user_id)
+        filepath = absolute_path(relative_path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+
+        document = ResumeDocument.objects.create(
+            user_id=self.user_id,
+            sha256=digest,
+            filename=filename,
+            path=relative_path,
+            sender_email=sender_email,
+            size=len(data)
+        )
+        return (self.link(document) if link else document), True
+
+    def adopt(self, filepath: str) -> Tuple[Optional[ResumeDocument], bool]:
+        """
+        Move a file from the old flat layout into its shard and catalog it.
+        A byte-identical copy of a stored resume is removed instead. Returns
+        (document, created).
+        """
+        digest = sha256_file(filepath)
+        existing = ResumeDocument.objects.filter(user_id=self.user_id, sha256=digest).first()
+        if existing is not None:
+            if os.path.exists(self.path_for(existing)):
+                os.remove(filepath)
+                return existing, False
+            # Catalogued under the flat layout: move the file, keep the row
+            self.relocate(existing, filepath)
+            return existing, False
+
+        filename = os.path.basename(filepath)
+        relative_path = shard_path(digest, filename, self.user_id)
+        target = absolute_path(relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(filepath, target)
+
+        document = ResumeDocument.objects.create(
+            user_id=self.user_id,
+            sha256=digest,
+            filename=filename,
+            path=relative_path,
+            size=os.path.getsize(target)
+        )
+        return self.link(document), True
+
+    def relocate(self, document: ResumeDocument, filepath: Optional[str] = None) -> ResumeDocument:
+        """Move a catalogued file to its shard path"""
+        relative_path = shard_path(document.sha256, document.filename, document.user_id)
+        if document.path == relative_path:
+            return document
+        source = filepath or self.path_for(document)
+        target = absolute_path(relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+        document.path = relative_path
+        document.save(update_fields=['path'])
+        return document
+
+    @staticmethod
+    def path_for(document: ResumeDocument) -> str:
+        return absolute_path(document.path)
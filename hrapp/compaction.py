@@ -0,0 +1,125 @@
+# hrapp/compaction.py
+"""
+Token-budgeted resume compaction for LLM prompts.
+
+Input tokens dominate the latency and cost of an extraction call, and
+most of a resume does not help fill in name, contact, skills and years of
+experience. `compact_resume` splits the text into sections by their
+headings, drops the ones that never do (references, hobbies, declarations,
+personal details), removes repeated lines and then fills the token budget
+in priority order:
+
+    contact (text before the first heading, plus any email/phone line),
+    skills, experience, education, projects, certifications, summary
+
+Lines under an unrecognised heading stay with the section above. A section that doesn't fit whole is cut at a line boundary, and a line longer than the budget left is truncated.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .candidate_info import EMAIL_RE, PHONE_RES
+from .metrics import REGISTRY
+
+COMPACTION_TOKENS = REGISTRY.counter(
+    'hrmatcher_compaction_tokens_total',
+    'Estimated resume tokens before and after compaction for LLM prompts',
+    ['stage']
+)
+
+SECTION_ALIASES = {
+    'skills': ('skills', 'technical skills', 'key skills', 'core competencies', 'technologies', 'tech stack'),
+    'experience': ('experience', 'work experience', 'professional experience', 'work history',
+                   'employment', 'employment history', 'career history'),
+    'education': ('education', 'academic background', 'qualifications', 'academic qualifications'),
+    'projects': ('projects', 'key projects', 'personal projects'),
+    'certifications': ('certifications', 'certificates', 'licenses', 'courses', 'training'),
+    'summary': ('summary', 'profile', 'professional summary', 'objective', 'career objective', 'about me'),
+    'references': ('references', 'referees'),
+    'dropped': ('hobbies', 'interests', 'hobbies and interests', 'declaration',
+                'personal details', 'personal information', 'languages known', 'extracurricular activities'),
+}
+SECTION_PRIORITY = ('contact', 'skills', 'experience', 'education', 'projects', 'certifications', 'summary')
+
+_HEADINGS = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+HEADING_RE = re.compile(
+    r'^\s*(?P<heading>'
+    + '|'.join(re.escape(alias).replace(r'\ ', r'\s+') for alias in sorted(_HEADINGS, key=len, reverse=True))
+    + r')'
+    r'\s*(?::\s*(?P<rest>.*)|[-–—]?\s*)$',
+    re.IGNORECASE
+)
+WHITESPACE_RE = re.compile(r'\s+')
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def split_sections(text: str) -> Dict[str, List[str]]:
+    """Lines per section; text before the first heading is 'contact'"""
+    sections: Dict[str, List[str]] = {'contact': []}
+    current = 'contact'
+    for line in text.splitlines():
+        match = HEADING_RE.match(line)
+        if match:
+            current = _HEADINGS[WHITESPACE_RE.sub(' ', match.group('heading').lower())]
+            sections.setdefault(current, [])
+            if match.group('rest'):
+                sections[current].append(match.group('rest'))
+            continue
+        sections.setdefault(current, []).append(line)
+    return sections
+
+
+def _is_contact_line(line: str) -> bool:
+    return bool(EMAIL_RE.search(line) or any(pattern.search(line) for pattern in PHONE_RES))
+
+
+def compact_resume(text: str, token_budget: Optional[int] = None) -> str:
+    """Resume text cut down to the sections an extractor needs, within `token_budget` tokens"""
+    if token_budget is None:
+        token_budget = getattr(settings, 'LLM_INPUT_TOKEN_BUDGET', 1500)
+    sections = split_sections(text)
+
+    # Contact details sometimes sit in a footer or personal-details block
+    # (but a referee's are not the candidate's)
+    for name, lines in sections.items():
+        if name not in ('contact', 'references'):
+            sections['contact'].extend(line for line in lines if _is_contact_line(line))
+
+    seen = set()
+    budget = token_budget * CHARS_PER_TOKEN
+    parts: List[Tuple[str, List[str]]] = []
+    for name in SECTION_PRIORITY:
+        kept = []
+        for line in sections.get(name, ()):
+            normalized = WHITESPACE_RE.sub(' ', line).strip()
+            key = normalized.lower()
+            if not normalized or key in seen:
+                continue
+            if len(normalized) + 1 > budget:
+                # Text with no line breaks (a flattened PDF) is one long line:
+                # truncate it to the budget rather than dropping it
+                if budget > 1:
+                    kept.append(normalized[:budget - 1].rstrip())
+                budget = 0
+                break
+            seen.add(key)
+            kept.append(normalized)
+            budget -= len(normalized) + 1
+        if kept:
+            parts.append((name, kept))
+        if budget <= 0:
+            break
+
+    compacted = '\n\n'.join(
+        '\n'.join(lines) if name == 'contact' else f"{name.title()}:\n" + '\n'.join(lines)
+        for name, lines in parts
+    )
+    COMPACTION_TOKENS.inc(estimate_tokens(text), stage='before')
+    COMPACTION_TOKENS.inc(estimate_tokens(compacted), stage='after')
+    return compacted
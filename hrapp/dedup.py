@@ -0,0 +1,172 @@
+# hrapp/dedup.py
+"""
+Resume de-duplication.
+
+Exact copies are caught with a SHA-256 of the file bytes. Re-saved or
+re-exported copies of the same CV (different bytes, same content) are
+caught with a 64-bit SimHash of the extracted text: two documents whose
+SimHashes differ in at most SIMHASH_MAX_DISTANCE bits are treated as the
+same candidate. SimHashIndex finds those neighbours through LSH banding
+instead of comparing against every stored hash.
+"""
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+SIMHASH_BITS = 64
+SIMHASH_MAX_DISTANCE = 3
+SHINGLE_SIZE = 3
+
+# Pigeonhole: with 4 bands of 16 bits, two hashes within 3 bits of each
+# other agree exactly on at least one band
+SIMHASH_BANDS = 4
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word 3-shingles of the lowercased text"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = [' '.join(words)] if words else []
+    else:
+        shingles = [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        feature = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if feature >> bit & 1 else -1
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def to_signed64(value: int) -> int:
+    """Store an unsigned 64-bit hash in a signed BigIntegerField"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_signed64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class SimHashIndex:
+    """LSH index over SimHashes for near-duplicate lookups"""
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE, bands: int = SIMHASH_BANDS):
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = SIMHASH_BITS // bands
+        self._band_mask = (1 << self.band_bits) - 1
+        self._buckets: Dict[Tuple[int, int], Set[Hashable]] = defaultdict(set)
+        self._hashes: Dict[Hashable, int] = {}
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _band_keys(self, value: int) -> Iterable[Tuple[int, int]]:
+        for band in range(self.bands):
+            yield band, (value >> (band * self.band_bits)) & self._band_mask
+
+    def add(self, key: Hashable, value: int) -> None:
+        self._hashes[key] = value
+        for band_key in self._band_keys(value):
+            self._buckets[band_key].add(key)
+
+    def find(self, value: int) -> Optional[Hashable]:
+        """Key of the closest stored hash within max_distance, or None"""
+        best_key, best_distance = None, self.max_distance + 1
+        seen = set()
+        for band_key in self._band_keys(value):
+            for key in self._buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                distance = hamming_distance(value, self._hashes[key])
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+        return best_key
+
+
+class Deduplicator:
+    """Tracks what has been seen during one pass over a set of resumes"""
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self._digests: Dict[str, Hashable] = {}
+        self.index = SimHashIndex(max_distance)
+
+    def original_for_digest(self, key: Hashable, digest: str) -> Optional[Hashable]:
+        """Key of an earlier exact copy, else remember this one and return None"""
+        original = self._digests.get(digest)
+        if original is None:
+            self._digests[digest] = key
+        return original
+
+    def original_for_text(self, key: Hashable, text: str) -> Optional[Hashable]:
+        """Key of an earlier near-duplicate, else remember this one and return None"""
+        value = simhash(text)
+        original = self.index.find(value)
+        if original is None:
+            self.index.add(key, value)
+        return original
+
+
+YEAR_RE = re.compile(r'(?:19|20)\d\d')
+
+
+def phone_key(phone: str) -> Optional[str]:
+    """
+    Last 10 digits of a plausible phone number, else None. extract_phone
+    also picks up runs of years ("2018-2020" -> 20182020), which would
+    merge different people with the same tenure, so anything shorter than
+    10 digits or made only of 19xx/20xx groups is not a key
+    """
+    digits = re.sub(r'\D', '', phone)
+    if len(digits) < 10:
+        return None
+    if len(digits) % 4 == 0 and all(YEAR_RE.fullmatch(digits[i:i + 4]) for i in range(0, len(digits), 4)):
+        return None
+    return digits[-10:]
+
+
+def collapse_candidates(rows):
+    """
+    Keep the first (best ranked) row per person, where rows sharing an
+    email address or phone number are the same person even if their
+    resumes differ (e.g. an old and an updated CV)
+    """
+    seen = set()
+    collapsed = []
+    for row in rows:
+        keys = set()
+        if row.get('email'):
+            keys.add(('email', row['email'].strip().lower()))
+        phone = phone_key(row.get('phone') or '')
+        if phone:
+            keys.add(('phone', phone))
+        if keys & seen:
+            continue
+        seen |= keys
+        collapsed.append(row)
+    return collapsed
@@ -1,31 +1,89 @@
 import os
+import csv
+import logging
+import tempfile
 from io import BytesIO
 from datetime import datetime
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-import xlsxwriter
+from xml.sax.saxutils import escape
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import content_disposition_header
 
+# xlsxwriter and reportlab are imported inside the exporters that use them,
+# so importing this module (and hrapp.views) does not pull them in
 
-# export_utils.py
-import os
-from io import BytesIO
-from datetime import datetime
-from django.http import HttpResponse
-from django.conf import settings
-import xlsxwriter
-import xlwt
+from .async_utils import aiter_blocking
+from .metrics import timed, timed_iter, record_cache
 
-import xlsxwriter
-from io import BytesIO
-from datetime import datetime
-from django.http import HttpResponse
+logger = logging.getLogger(__name__)
 
-def export_to_excel(candidates, filename="matching_candidates"):
-    output = BytesIO()
-    workbook = xlsxwriter.Workbook(output)
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Spooled exports stay in RAM up to this size, then roll over to a temp file
+EXPORT_SPOOL_MAX_SIZE = getattr(settings, 'EXPORT_SPOOL_MAX_SIZE', 8 * 1024 * 1024)
+# Bytes per chunk when a finished export file is streamed back
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_file_chunks(fileobj):
+    try:
+        while chunk := fileobj.read(EXPORT_CHUNK_SIZE):
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def file_download_response(fileobj, filename, content_type, as_attachment=True):
+    """
+    Stream an open file in chunks with an async body (the site runs under
+    ASGI, where a sync body is read whole into memory before it is sent).
+    The file is closed once it has been sent
+    """
+    size = fileobj.seek(0, os.SEEK_END)
+    fileobj.seek(0)
+    response = StreamingHttpResponse(aiter_blocking(_iter_file_chunks(fileobj)), content_type=content_type)
+    response['Content-Length'] = str(size)
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
+
+# Column configuration
+EXCEL_COLUMNS = [
+    ('Name', 25),
+    ('Match Score (%)', 15),
+    ('Experience (Years)', 18),
+    ('Email', 30),
+    ('Phone', 20),
+    ('Matched Skills', 40),
+    ('Missing Skills', 40)
+]
+
+
+def _get_value(candidate, key, default='N/A'):
+    """Safe value extraction"""
+    value = candidate.get(key)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip() or default
+    return value
+
+
+def _get_float(candidate, key, default=0.0):
+    """Numeric field extraction, tolerant of strings like '85%'"""
+    try:
+        value = candidate.get(key)
+        if isinstance(value, str):
+            # Remove non-numeric characters
+            value = ''.join(c for c in value if c.isdigit() or c in ('.', '-'))
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _write_excel_rows(workbook, candidates):
+    """Write the header and one row per candidate, strictly in row order
+    so the same code works with xlsxwriter's constant_memory mode."""
     worksheet = workbook.add_worksheet("Matched Candidates")
 
     # Define formats
@@ -41,59 +99,28 @@ def export_to_excel(candidates, filename="matching_candidates"):
     text_format = workbook.add_format({'num_format': '@'})  # Force text format
     number_format = workbook.add_format({'num_format': '0.00'})
 
-    # Column configuration
-    columns = [
-        ('Name', 25),
-        ('Match Score (%)', 15),
-        ('Experience (Years)', 18),
-        ('Email', 30),
-        ('Phone', 20),
-        ('Matched Skills', 40),
-        ('Missing Skills', 40)
-    ]
-
     # Write headers
-    for col_idx, (header, width) in enumerate(columns):
+    for col_idx, (header, width) in enumerate(EXCEL_COLUMNS):
         worksheet.set_column(col_idx, col_idx, width)
         worksheet.write(0, col_idx, header, header_format)
 
     # Data processing with error handling
     for row_idx, candidate in enumerate(candidates, start=1):
         try:
-            # Safe value extraction
-            def get_value(key, default='N/A'):
-                value = candidate.get(key)
-                if value is None:
-                    return default
-                if isinstance(value, str):
-                    return value.strip() or default
-                return value
-
-            # Process numeric fields
-            def get_float(key, default=0.0):
-                try:
-                    value = candidate.get(key)
-                    if isinstance(value, str):
-                        # Remove non-numeric characters
-                        value = ''.join(c for c in value if c.isdigit() or c in ('.', '-'))
-                    return float(value) if value not in (None, '') else default
-                except (TypeError, ValueError):
-                    return default
-
             # Extract all values
-            name = get_value('name')
-            score = get_float('score')
-            experience = get_float('experience')
-            email = get_value('email')
-            phone = get_value('phone')
+            name = _get_value(candidate, 'name')
+            score = _get_float(candidate, 'score')
+            experience = _get_float(candidate, 'experience')
+            email = _get_value(candidate, 'email')
+            phone = _get_value(candidate, 'phone')
             
             # Force text format for phone numbers
             if str(phone).strip() not in ('', 'N/A'):
                 phone = f"'{phone}"  # Prepend apostrophe to force text format
 
             # Process skills lists
-            matched_skills = ', '.join(map(str, candidate.get('matched_skills', []))) or 'None'
-            missing_skills = ', '.join(map(str, candidate.get('missing_skills', []))) or 'None'
+            matched_skills = ', '.join(map(str, candidate.get('matched_skills') or [])) or 'None'
+            missing_skills = ', '.join(map(str, candidate.get('missing_skills') or [])) or 'None'
 
             # Write data to worksheet
             worksheet.write(row_idx, 0, name, text_format)
@@ -105,22 +132,284 @@ def export_to_excel(candidates, filename="matching_candidates"):
             worksheet.write(row_idx, 6, missing_skills, text_format)
 
         except Exception as e:
-            print(f"Error processing row {row_idx}: {str(e)}")
+            logger.error(f"Error processing row {row_idx}: {str(e)}")
             continue
 
+
+@timed('export_excel')
+def export_to_excel(candidates, filename="matching_candidates", streaming=False):
+    if streaming:
+        return export_to_excel_streaming(candidates, filename)
+
+    import xlsxwriter
+
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output)
+    _write_excel_rows(workbook, candidates)
     workbook.close()
     output.seek(0)
     
     response = HttpResponse(
         output.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        content_type=EXCEL_CONTENT_TYPE,
         headers={'Content-Disposition': f'attachment; filename="{filename}_{datetime.now().date()}.xlsx"'}
     )
     return response
 
-def export_to_pdf(candidates, filename="matching_candidates"):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+
+def export_to_excel_streaming(candidates, filename="matching_candidates"):
+    """Constant-memory Excel export.
+
+    Rows are flushed to disk as they are written (xlsxwriter constant_memory),
+    the finished workbook goes to a spooled temp file and is streamed back in
+    chunks, so memory stays flat no matter how many candidates are exported.
+    `candidates` can be any iterable, including a generator over stored results.
+    """
+    import xlsxwriter
+
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    _write_excel_rows(workbook, candidates)
+    workbook.close()
+
+    return file_download_response(output, f"{filename}_{datetime.now().date()}.xlsx", EXCEL_CONTENT_TYPE)
+
+
+# Flat candidate fields shared by the analytics formats (CSV, Parquet, Arrow)
+EXPORT_FIELDS = [
+    'name', 'score', 'experience', 'email', 'phone',
+    'matched_skills', 'missing_skills'
+]
+
+# Rows buffered per Arrow record batch / Parquet row group
+ARROW_BATCH_SIZE = getattr(settings, 'ARROW_BATCH_SIZE', 10000)
+
+
+def _skills_list(candidate, key):
+    value = candidate.get(key) or []
+    if isinstance(value, str):
+        return [s.strip() for s in value.split(',') if s.strip()]
+    return [str(s) for s in value]
+
+
+def _export_record(candidate):
+    return {
+        'name': _get_value(candidate, 'name', ''),
+        'score': _get_float(candidate, 'score'),
+        'experience': _get_float(candidate, 'experience'),
+        'email': _get_value(candidate, 'email', ''),
+        'phone': str(_get_value(candidate, 'phone', '')),
+        'matched_skills': _skills_list(candidate, 'matched_skills'),
+        'missing_skills': _skills_list(candidate, 'missing_skills'),
+    }
+
+
+class _Echo:
+    """File-like object whose write() hands the value back, for csv.writer streaming"""
+
+    def write(self, value):
+        return value
+
+
+def _iter_csv_lines(candidates):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for candidate in candidates:
+        record = _export_record(candidate)
+        record['matched_skills'] = ', '.join(record['matched_skills'])
+        record['missing_skills'] = ', '.join(record['missing_skills'])
+        yield writer.writerow([record[field] for field in EXPORT_FIELDS])
+
+
+def export_to_csv(candidates, filename="matching_candidates"):
+    """Stream candidates as CSV, one row at a time"""
+    # Rows are produced while the response is sent, so the generator is timed, not this call
+    return StreamingHttpResponse(
+        aiter_blocking(timed_iter('export_csv', _iter_csv_lines(candidates))),
+        content_type='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{filename}_{datetime.now().date()}.csv"'}
+    )
+
+
+@timed('export_arrow')
+def export_to_arrow(candidates, filename="matching_candidates", file_format='parquet'):
+    """Columnar export as Parquet or Arrow IPC, ready for pandas / DuckDB.
+
+    Skills are kept as list<string> columns rather than joined strings.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required for parquet/arrow exports")
+
+    schema = pa.schema([
+        ('name', pa.string()),
+        ('score', pa.float64()),
+        ('experience', pa.float64()),
+        ('email', pa.string()),
+        ('phone', pa.string()),
+        ('matched_skills', pa.list_(pa.string())),
+        ('missing_skills', pa.list_(pa.string())),
+    ])
+
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(output, schema)
+        extension, content_type = 'parquet', 'application/vnd.apache.parquet'
+    else:
+        writer = pa.ipc.new_file(output, schema)
+        extension, content_type = 'arrow', 'application/vnd.apache.arrow.file'
+
+    def flush(columns):
+        writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+
+    columns = {field: [] for field in EXPORT_FIELDS}
+    rows = 0
+    for candidate in candidates:
+        record = _export_record(candidate)
+        for field in EXPORT_FIELDS:
+            columns[field].append(record[field])
+        rows += 1
+        if rows % ARROW_BATCH_SIZE == 0:
+            flush(columns)
+            columns = {field: [] for field in EXPORT_FIELDS}
+    if columns['name'] or rows == 0:
+        flush(columns)
+    writer.close()
+
+    return file_download_response(output, f"{filename}_{datetime.now().date()}.{extension}", content_type)
+
+
+def iter_job_candidates(job_req_id, user_id):
+    """Yield the user's stored match results for a JobRequirement without a client round-trip"""
+    from .models import MatchResult
+
+    if user_id is None:
+        return
+    match_result = MatchResult.objects.filter(user_id=user_id, job_requirement_id=job_req_id).first()
+    if match_result is not None:
+        yield from match_result.iter_candidates()
+        return
+
+    # Results computed before they were persisted only live in the cache
+    cached = cache.get(f'matched_{user_id}_{job_req_id}')
+    record_cache('job_results', cached is not None)
+    for candidate in cached or []:
+        yield candidate
+
+
+PDF_HEADER = [
+    "Rank", "Candidate", "Score (%)",
+    "Experience", "Matched Skills", "Missing Skills"
+]
+
+# Fixed widths (landscape letter minus margins) so ReportLab never has to
+# measure every cell to size the columns
+PDF_COL_WIDTHS = [35, 130, 55, 60, 220, 220]
+
+# Rows per LongTable; each chunk is laid out independently and can split
+# across pages with the header repeated
+PDF_ROWS_PER_CHUNK = getattr(settings, 'PDF_ROWS_PER_CHUNK', 500)
+
+# Reports bigger than this are rendered by a Celery task instead of in the request
+PDF_BACKGROUND_THRESHOLD = getattr(settings, 'PDF_BACKGROUND_THRESHOLD', 1000)
+
+_pdf_styles = None
+
+
+def _get_pdf_styles():
+    """(base table style, score bands, text cell style), built once reportlab is imported"""
+    global _pdf_styles
+    if _pdf_styles is None:
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import ParagraphStyle
+
+        base_style = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]
+        # (min score, background, text colour) for the score column
+        score_bands = [
+            (75, colors.HexColor('#C6EFCE'), colors.HexColor('#006100')),
+            (50, colors.HexColor('#FFEB9C'), colors.HexColor('#9C5700')),
+            (float('-inf'), colors.HexColor('#FFC7CE'), colors.HexColor('#9C0006')),
+        ]
+        # Names and skill lists wrap inside the fixed column widths instead of
+        # running over the next column; long unbroken words are split too
+        cell_style = ParagraphStyle(
+            'PdfCell', fontName='Helvetica', fontSize=8, leading=10,
+            alignment=TA_CENTER, splitLongWords=True
+        )
+        _pdf_styles = (base_style, score_bands, cell_style)
+    return _pdf_styles
+
+
+def _pdf_cell(text, style):
+    from reportlab.platypus import Paragraph
+    return Paragraph(escape(str(text)), style)
+
+
+def _pdf_table(rows, scores):
+    """Build one LongTable chunk with all of its styles applied in a single setStyle"""
+    from reportlab.platypus import LongTable, TableStyle
+
+    base_style, score_bands, _ = _get_pdf_styles()
+    style = list(base_style)
+    # Conditional formatting for scores, row 0 is the header
+    for row, score in enumerate(scores, start=1):
+        for min_score, bg_color, text_color in score_bands:
+            if score >= min_score:
+                break
+        style.append(('BACKGROUND', (2, row), (2, row), bg_color))
+        style.append(('TEXTCOLOR', (2, row), (2, row), text_color))
+
+    table = LongTable([PDF_HEADER] + rows, colWidths=PDF_COL_WIDTHS, repeatRows=1)
+    table.setStyle(TableStyle(style))
+    return table
+
+
+def _pdf_tables(candidates):
+    """Yield LongTable chunks of PDF_ROWS_PER_CHUNK candidates each"""
+    _, _, cell_style = _get_pdf_styles()
+    rows, scores = [], []
+    emitted = False
+    for idx, candidate in enumerate(candidates, start=1):
+        score = _get_float(candidate, 'score')
+        rows.append([
+            str(idx),
+            _pdf_cell(_get_value(candidate, 'name'), cell_style),
+            f"{score:.1f}",
+            str(candidate.get('experience', 0)),
+            _pdf_cell(', '.join(map(str, candidate.get('matched_skills') or [])) or 'None', cell_style),
+            _pdf_cell(', '.join(map(str, candidate.get('missing_skills') or [])) or 'None', cell_style)
+        ])
+        scores.append(score)
+        if len(rows) >= PDF_ROWS_PER_CHUNK:
+            yield _pdf_table(rows, scores)
+            emitted = True
+            rows, scores = [], []
+    if rows or not emitted:
+        yield _pdf_table(rows, scores)
+
+
+@timed('export_pdf')
+def build_pdf_report(candidates, output):
+    """Render the candidates report into `output` (a path or binary file object)"""
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph
+
+    doc = SimpleDocTemplate(output, pagesize=landscape(letter))
     styles = getSampleStyleSheet()
     elements = []
 
@@ -135,63 +424,21 @@ def export_to_pdf(candidates, filename="matching_candidates"):
     # Add space
     elements.append(Paragraph("<br/><br/>", styles['Normal']))
 
-    # Prepare data for table
-    data = [
-        [
-            "Rank", "Candidate", "Score (%)", 
-            "Experience", "Matched Skills", "Missing Skills"
-        ]
-    ]
+    elements.extend(_pdf_tables(candidates))
+    doc.build(elements)
 
-    for idx, candidate in enumerate(candidates, start=1):
-        print(f"DEBUG: Candidate matched_skills = {candidate.get('matched_skills')}")
 
-        data.append([
-            str(idx),
-            candidate.get('name', 'N/A'),
-            f"{candidate.get('score', 0):.1f}",
-            str(candidate.get('experience', 0)),
-            ', '.join(candidate.get('matched_skills', [])) if candidate.get('matched_skills') else 'None',
-            ', '.join(candidate.get('missing_skills', [])) if candidate.get('missing_skills') else 'None'
+def export_to_pdf(candidates, filename="matching_candidates"):
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    build_pdf_report(candidates, output)
 
-        ])
+    return file_download_response(output, f"{filename}_{datetime.now().date()}.pdf", 'application/pdf')
 
-    # Create table
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-
-    # Add conditional formatting for scores
-    for row in range(1, len(data)):
-        score = float(data[row][2])
-        if score >= 75:
-            bg_color = colors.HexColor('#C6EFCE')
-            text_color = colors.HexColor('#006100')
-        elif score >= 50:
-            bg_color = colors.HexColor('#FFEB9C')
-            text_color = colors.HexColor('#9C5700')
-        else:
-            bg_color = colors.HexColor('#FFC7CE')
-            text_color = colors.HexColor('#9C0006')
-        
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (2, row), (2, row), bg_color),
-            ('TEXTCOLOR', (2, row), (2, row), text_color),
-        ]))
-
-    elements.append(table)
-    doc.build(elements)
-    
-    buffer.seek(0)
-    response = HttpResponse(buffer.read(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}_{datetime.now().date()}.pdf"'
-    return response
\ No newline at end of file
+
+def get_export_dir(user_id=None):
+    """Directory for reports generated in the background, one user_<id> directory per owner"""
+    export_dir = os.path.join(settings.MEDIA_ROOT, 'exports')
+    if user_id is not None:
+        export_dir = os.path.join(export_dir, f"user_{user_id}")
+    os.makedirs(export_dir, exist_ok=True)
+    return export_dir
@@ -0,0 +1,82 @@
+# hrapp/extraction.py
+"""
+Registry of text extraction backends, keyed by file extension.
+
+Parser libraries (pdfplumber, PyPDF2, python-docx) are imported inside the
+backend that needs them, so importing this module, hrapp.utils or
+hrapp.views stays cheap and a worker only loads the parsers for the file
+types it actually sees.
+
+Extra or replacement backends can be registered in code with
+`register_text_extractor` or from settings:
+
+    TEXT_EXTRACTORS = {'.doc': 'myapp.parsers.extract_doc'}
+"""
+import os
+from typing import Callable, Dict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+TextExtractor = Callable[[str], str]
+
+_TEXT_EXTRACTORS: Dict[str, TextExtractor] = {}
+_settings_loaded = False
+
+
+def register_text_extractor(*extensions: str):
+    """Decorator registering a `path -> text` function for the given extensions"""
+    def decorator(func: TextExtractor) -> TextExtractor:
+        for ext in extensions:
+            _TEXT_EXTRACTORS[ext.lower()] = func
+        return func
+    return decorator
+
+
+def _load_settings_extractors() -> None:
+    global _settings_loaded
+    if _settings_loaded:
+        return
+    for ext, dotted_path in getattr(settings, 'TEXT_EXTRACTORS', {}).items():
+        _TEXT_EXTRACTORS[ext.lower()] = import_string(dotted_path)
+    _settings_loaded = True
+
+
+def get_text_extractor(filepath: str) -> TextExtractor:
+    """Backend for `filepath`'s extension, or ValueError if none is registered"""
+    _load_settings_extractors()
+    ext = os.path.splitext(filepath)[1].lower()
+    try:
+        return _TEXT_EXTRACTORS[ext]
+    except KeyError:
+        raise ValueError(f"Unsupported file type: {filepath}")
+
+
+def supported_extensions():
+    _load_settings_extractors()
+    return tuple(_TEXT_EXTRACTORS)
+
+
+@register_text_extractor('.txt')
+def extract_txt(filepath: str) -> str:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@register_text_extractor('.pdf')
+def extract_pdf(filepath: str) -> str:
+    # Try pdfplumber first
+    try:
+        import pdfplumber
+        with pdfplumber.open(filepath) as pdf:
+            return "\n".join(page.extract_text() or "" for page in pdf.pages)
+    except Exception:
+        from PyPDF2 import PdfReader
+        with open(filepath, 'rb') as f:
+            return " ".join(page.extract_text() or "" for page in PdfReader(f).pages)
+
+
+@register_text_extractor('.docx')
+def extract_docx(filepath: str) -> str:
+    from docx import Document
+    return " ".join(p.text for p in Document(filepath).paragraphs if p.text)
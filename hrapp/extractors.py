@@ -0,0 +1,318 @@
+# hrapp/extractors.py
+"""
+Candidate field extractor backends.
+
+An extractor turns resume text plus the searched skills into the
+candidate fields the matcher shows (name, email, phone, skills,
+experience). Backends share one interface and are chosen per Celery queue
+(or "interactive" for requests served by the views) from settings, so a
+backend can be benchmarked or swapped without touching view code:
+
+    EXTRACTOR_BACKENDS = {'default': 'gemini', 'interactive': 'gemini', 'llm': 'local'}
+
+Built in:
+
+    regex    deterministic patterns, no model
+    gemini   Google Gemini (GEMINI_MODEL), regex on failure
+    local    a GGUF model on CPU through llama-cpp-python (LOCAL_LLM_MODEL_PATH)
+    stub     canned, deterministic output for tests and load tests
+
+Values may also be dotted paths to ExtractorBackend subclasses. Every
+call is timed and, for model backends, its tokens and estimated cost are
+counted per backend (hrmatcher_extractor_* metrics).
+"""
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Type
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .async_utils import run_cpu
+from .compaction import compact_resume
+from .llm_output import CANDIDATE_FIELDS_RESPONSE_SCHEMA, CANDIDATE_FIELDS_SCHEMA, parse_candidate_fields
+from .metrics import REGISTRY, timer
+
+logger = logging.getLogger(__name__)
+
+EXTRACTOR_SECONDS = REGISTRY.histogram(
+    'hrmatcher_extractor_duration_seconds',
+    'Wall time of candidate field extraction calls by backend',
+    ['backend']
+)
+EXTRACTOR_CALLS = REGISTRY.counter(
+    'hrmatcher_extractor_calls_total',
+    'Candidate field extraction calls by backend and outcome (ok/fallback/error)',
+    ['backend', 'outcome']
+)
+EXTRACTOR_TOKENS = REGISTRY.counter(
+    'hrmatcher_extractor_tokens_total',
+    'Model tokens used by extractor backends, by direction (input/output)',
+    ['backend', 'direction']
+)
+EXTRACTOR_COST = REGISTRY.counter(
+    'hrmatcher_extractor_cost_usd_total',
+    'Estimated spend of extractor backends in US dollars',
+    ['backend']
+)
+
+DEFAULT_QUEUE = 'default'
+
+
+def extract_direct_search_fallback(resume_text: str, searched_skills: List[str]) -> Dict[str, any]:
+    """Fallback skill extractor"""
+    from .utils import extract_email_from_resume, extract_experience, extract_name_from_resume, extract_phone
+    text_lower = resume_text.lower()
+    return {
+        "name": extract_name_from_resume(resume_text),
+        "email": extract_email_from_resume(resume_text),
+        "phone": extract_phone(resume_text),
+        "skills": [s for s in searched_skills if re.search(rf'\b{re.escape(s.lower())}\b', text_lower)],
+        "experience": extract_experience(resume_text),
+        "source": "DirectSearch"
+    }
+
+
+def skills_prompt(resume_text: str, searched_skills: List[str]) -> str:
+    return f"""Extract from resume as JSON:
+{{
+    "name": "Full Name",
+    "email": "email@example.com",
+    "phone": "+1234567890",
+    "skills": ["only", "requested", "skills"],
+    "experience": years
+}}
+Skills to match: {searched_skills}
+
+Resume:
+{resume_text}"""
+
+
+def parse_skills_response(response_text: str, searched_skills: List[str], source: str,
+                          backend: str = '') -> Dict[str, any]:
+    """Candidate fields from a model's JSON answer (LLMOutputError if it can't be read)"""
+    fields = parse_candidate_fields(response_text, backend)
+    searched = {sk.lower() for sk in searched_skills}
+    return {
+        "name": (fields.name or "Unknown").title(),
+        "email": fields.email,
+        "phone": fields.phone,
+        "skills": [s.lower() for s in fields.skills if s.lower() in searched],
+        "experience": fields.experience,
+        "source": source
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) when a backend reports none"""
+    return max(1, len(text) // 4)
+
+
+class ExtractorBackend:
+    """
+    Interface for candidate field extractors. Subclasses implement
+    `_extract` (and `_aextract` when they have a native async client);
+    `extract`/`aextract` add timing, accounting and the regex fallback.
+    """
+    name = ''
+    # US dollars per 1,000 tokens, overridable with settings.EXTRACTOR_COSTS
+    input_cost_per_1k = 0.0
+    output_cost_per_1k = 0.0
+    fallback_to_regex = True
+    # Model backends send a compacted resume (hrapp.compaction) instead of the full text
+    compact_input = False
+
+    def __init__(self):
+        costs = getattr(settings, 'EXTRACTOR_COSTS', {}).get(self.name)
+        if costs:
+            self.input_cost_per_1k, self.output_cost_per_1k = costs
+
+    def _extract(self, resume_text: str, searched_skills: List[str]) -> Dict[str, any]:
+        raise NotImplementedError
+
+    async def _aextract(self, resume_text: str, searched_skills: List[str]) -> Dict[str, any]:
+        return await run_cpu(self._extract, resume_text, searched_skills)
+
+    def prompt(self, resume_text: str, searched_skills: List[str]) -> str:
+        if self.compact_input:
+            resume_text = compact_resume(resume_text)
+        return skills_prompt(resume_text, searched_skills)
+
+    def record_usage(self, input_tokens: int, output_tokens: int) -> None:
+        EXTRACTOR_TOKENS.inc(input_tokens, backend=self.name, direction='input')
+        EXTRACTOR_TOKENS.inc(output_tokens, backend=self.name, direction='output')
+        cost = (input_tokens * self.input_cost_per_1k + output_tokens * self.output_cost_per_1k) / 1000
+        if cost:
+            EXTRACTOR_COST.inc(cost, backend=self.name)
+
+    def _fallback(self, resume_text: str, searched_skills: List[str], error: Exception) -> Dict[str, any]:
+        if not self.fallback_to_regex:
+            EXTRACTOR_CALLS.inc(backend=self.name, outcome='error')
+            raise error
+        logger.warning(f"{self.name} extractor failed, using regex: {str(error)}")
+        EXTRACTOR_CALLS.inc(backend=self.name, outcome='fallback')
+        return extract_direct_search_fallback(resume_text, searched_skills)
+
+    def extract(self, resume_text: str, searched_skills: List[str]) -> Dict[str, any]:
+        start = time.perf_counter()
+        try:
+            with timer('llm_extract'):
+                fields = self._extract(resume_text, searched_skills)
+        except Exception as e:
+            return self._fallback(resume_text, searched_skills, e)
+        finally:
+            EXTRACTOR_SECONDS.observe(time.perf_counter() - start, backend=self.name)
+        EXTRACTOR_CALLS.inc(backend=self.name, outcome='ok')
+        return fields
+
+    async def aextract(self, resume_text: str, searched_skills: List[str]) -> Dict[str, any]:
+        start = time.perf_counter()
+        try:
+            with timer('llm_extract'):
+                fields = await self._aextract(resume_text, searched_skills)
+        except Exception as e:
+            return await run_cpu(self._fallback, resume_text, searched_skills, e)
+        finally:
+            EXTRACTOR_SECONDS.observe(time.perf_counter() - start, backend=self.name)
+        EXTRACTOR_CALLS.inc(backend=self.name, outcome='ok')
+        return fields
+
+
+class RegexExtractor(ExtractorBackend):
+    name = 'regex'
+    fallback_to_regex = False
+
+    def _extract(self, resume_text, searched_skills):
+        return extract_direct_search_fallback(resume_text, searched_skills)
+
+
+class GeminiExtractor(ExtractorBackend):
+    name = 'gemini'
+    # gemini-1.5-pro list price for prompts up to 128k tokens
+    input_cost_per_1k = 0.00125
+    output_cost_per_1k = 0.005
+    compact_input = True
+    # JSON mode constrained to CandidateFields: the model answers with a bare JSON object of those fields
+    generation_config = {
+        'response_mime_type': 'application/json',
+        'response_schema': CANDIDATE_FIELDS_RESPONSE_SCHEMA,
+    }
+
+    def _model(self):
+        from .utils import get_gemini_model
+        return get_gemini_model()
+
+    def _parse(self, response, prompt: str, searched_skills: List[str]) -> Dict[str, any]:
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None and getattr(usage, 'prompt_token_count', None):
+            self.record_usage(usage.prompt_token_count, usage.candidates_token_count or 0)
+        else:
+            self.record_usage(estimate_tokens(prompt), estimate_tokens(response.text or ''))
+        return parse_skills_response(response.text, searched_skills, source='Gemini', backend=self.name)
+
+    def _extract(self, resume_text, searched_skills):
+        prompt = self.prompt(resume_text, searched_skills)
+        response = self._model().generate_content(prompt, generation_config=self.generation_config)
+        return self._parse(response, prompt, searched_skills)
+
+    async def _aextract(self, resume_text, searched_skills):
+        prompt = self.prompt(resume_text, searched_skills)
+        response = await self._model().generate_content_async(prompt, generation_config=self.generation_config)
+        return self._parse(response, prompt, searched_skills)
+
+
+class LocalModelExtractor(ExtractorBackend):
+    """Offline extraction with a local GGUF model (pip install llama-cpp-python)"""
+    name = 'local'
+    compact_input = True
+    _llm = None
+    # A Llama instance is not thread-safe and aextract runs on the CPU pool,
+    # so loading and every completion go through one lock (the model uses
+    # all LOCAL_LLM_THREADS for a single completion anyway)
+    _lock = threading.Lock()
+
+    @classmethod
+    def _model(cls):
+        if cls._llm is None:
+            model_path = getattr(settings, 'LOCAL_LLM_MODEL_PATH', '')
+            if not model_path:
+                raise ImproperlyConfigured("LOCAL_LLM_MODEL_PATH is not set")
+            from llama_cpp import Llama
+            cls._llm = Llama(
+                model_path=model_path,
+                n_ctx=getattr(settings, 'LOCAL_LLM_CONTEXT', 4096),
+                n_threads=getattr(settings, 'LOCAL_LLM_THREADS', None),
+                verbose=False
+            )
+        return cls._llm
+
+    def _extract(self, resume_text, searched_skills):
+        prompt = self.prompt(resume_text, searched_skills)
+        with self._lock:
+            completion = self._model().create_chat_completion(
+                messages=[{'role': 'user', 'content': prompt}],
+                response_format={'type': 'json_object', 'schema': CANDIDATE_FIELDS_SCHEMA},
+                temperature=0.1,
+                max_tokens=500
+            )
+        usage = completion.get('usage') or {}
+        self.record_usage(usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+        content = completion['choices'][0]['message']['content']
+        return parse_skills_response(content, searched_skills, source='Local', backend=self.name)
+
+
+class StubExtractor(ExtractorBackend):
+    """Deterministic, dependency-free output: searched skills that occur in the text"""
+    name = 'stub'
+    fallback_to_regex = False
+
+    def _extract(self, resume_text, searched_skills):
+        text_lower = resume_text.lower()
+        return {
+            "name": "Stub Candidate",
+            "email": "",
+            "phone": "",
+            "skills": [s.lower() for s in searched_skills if s.lower() in text_lower],
+            "experience": 0.0,
+            "source": "Stub"
+        }
+
+    async def _aextract(self, resume_text, searched_skills):
+        return self._extract(resume_text, searched_skills)
+
+
+BACKENDS: Dict[str, Type[ExtractorBackend]] = {
+    backend.name: backend
+    for backend in (RegexExtractor, GeminiExtractor, LocalModelExtractor, StubExtractor)
+}
+
+_instances: Dict[str, ExtractorBackend] = {}
+
+
+def register_extractor(backend: Type[ExtractorBackend]) -> Type[ExtractorBackend]:
+    """Class decorator making a backend selectable by its name"""
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def backend_for_queue(queue: Optional[str] = None) -> str:
+    """Configured backend name or dotted path for a queue, falling back to 'default'"""
+    configured = getattr(settings, 'EXTRACTOR_BACKENDS', {})
+    return configured.get(queue or DEFAULT_QUEUE) or configured.get(DEFAULT_QUEUE) or 'gemini'
+
+
+def get_backend(name: str) -> ExtractorBackend:
+    """Shared instance of a backend by name or dotted path"""
+    backend = _instances.get(name)
+    if backend is None:
+        backend_class = BACKENDS.get(name) or import_string(name)
+        backend = _instances[name] = backend_class()
+    return backend
+
+
+def get_extractor(queue: Optional[str] = None) -> ExtractorBackend:
+    """Backend configured for a queue (see EXTRACTOR_BACKENDS)"""
+    return get_backend(backend_for_queue(queue))
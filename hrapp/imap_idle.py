@@ -0,0 +1,282 @@
+# hrapp/imap_idle.py
+"""
+IMAP IDLE push listener.
+
+One asyncio coroutine per mailbox keeps a connection in IDLE (RFC 2177)
+and, when the server reports EXISTS, searches for UIDs above the last one
+it has seen and hands only those to `enqueue(user_id, folder, uids)`,
+which by default queues the ingest_mailbox_uids Celery task. New resumes
+are ingested seconds after they arrive without polling the server.
+
+The client speaks just enough IMAP4rev1 over asyncio streams for this
+(LOGIN, SELECT, UID SEARCH, IDLE/DONE, LOGOUT), so it needs no extra
+dependency and can be pointed at a plain-text local stand-in server with
+ssl_context=None. Run it with the imap_idle management command.
+"""
+import asyncio
+import logging
+import re
+import ssl
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Servers may drop an IDLE after 30 minutes; RFC 2177 asks clients to
+# re-issue it before then
+IDLE_TIMEOUT = 29 * 60
+RECONNECT_DELAYS = (1, 2, 5, 10, 30, 60)
+
+EXISTS_RE = re.compile(rb'^\* (\d+) EXISTS', re.IGNORECASE)
+UIDNEXT_RE = re.compile(rb'\[UIDNEXT (\d+)\]', re.IGNORECASE)
+UIDVALIDITY_RE = re.compile(rb'\[UIDVALIDITY (\d+)\]', re.IGNORECASE)
+SEARCH_RE = re.compile(rb'^\* SEARCH\b(.*)$', re.IGNORECASE)
+
+Enqueue = Callable[[int, str, List[int]], Awaitable[None]]
+
+
+class ImapError(Exception):
+    pass
+
+
+def quote(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class AsyncImapClient:
+    """Minimal tagged-command IMAP client on asyncio streams"""
+
+    def __init__(self, host: str, port: int = 993, ssl_context: Optional[ssl.SSLContext] = None):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._tag = 0
+
+    async def connect(self, timeout: float = 30) -> None:
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl_context), timeout
+        )
+        greeting = await self._readline()
+        if not greeting.upper().startswith((b'* OK', b'* PREAUTH')):
+            raise ImapError(f"Unexpected greeting: {greeting!r}")
+
+    async def _readline(self) -> bytes:
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("IMAP connection closed")
+        return line.rstrip(b'\r\n')
+
+    async def _send(self, line: str) -> None:
+        self.writer.write(line.encode('utf-8') + b'\r\n')
+        await self.writer.drain()
+
+    def _next_tag(self) -> str:
+        self._tag += 1
+        return f"A{self._tag:04d}"
+
+    async def command(self, command: str, timeout: float = 60) -> List[bytes]:
+        """Run one command and return its untagged responses (ImapError unless OK)"""
+        tag = self._next_tag()
+        await self._send(f"{tag} {command}")
+        untagged = []
+        while True:
+            line = await asyncio.wait_for(self._readline(), timeout)
+            if line.startswith(tag.encode() + b' '):
+                status = line[len(tag) + 1:]
+                if not status.upper().startswith(b'OK'):
+                    verb = command.split(' ', 1)[0]
+                    raise ImapError(f"{verb} failed: {status.decode(errors='replace')}")
+                return untagged
+            untagged.append(line)
+
+    async def login(self, username: str, password: str) -> None:
+        await self.command(f"LOGIN {quote(username)} {quote(password)}")
+
+    async def select(self, folder: str) -> Tuple[Optional[int], Optional[int]]:
+        """Select a folder read-only; returns (UIDVALIDITY, UIDNEXT) when the server sends them"""
+        uidvalidity = uidnext = None
+        for line in await self.command(f"EXAMINE {quote(folder)}"):
+            if match := UIDVALIDITY_RE.search(line):
+                uidvalidity = int(match.group(1))
+            if match := UIDNEXT_RE.search(line):
+                uidnext = int(match.group(1))
+        return uidvalidity, uidnext
+
+    async def uids_after(self, last_uid: int) -> List[int]:
+        """UIDs strictly greater than last_uid ("n:*" always includes the newest message)"""
+        uids = []
+        for line in await self.command(f"UID SEARCH UID {last_uid + 1}:*"):
+            if match := SEARCH_RE.match(line):
+                uids.extend(int(uid) for uid in match.group(1).split())
+        return sorted(uid for uid in uids if uid > last_uid)
+
+    async def idle(self, timeout: float = IDLE_TIMEOUT) -> bool:
+        """Wait in IDLE until the server reports new mail (True) or timeout (False)"""
+        tag = self._next_tag()
+        await self._send(f"{tag} IDLE")
+        line = await asyncio.wait_for(self._readline(), 30)
+        if not line.startswith(b'+'):
+            raise ImapError(f"IDLE refused: {line!r}")
+
+        got_mail = False
+        try:
+            while True:
+                line = await asyncio.wait_for(self._readline(), timeout)
+                if EXISTS_RE.match(line):
+                    got_mail = True
+                    break
+        except asyncio.TimeoutError:
+            pass
+
+        await self._send("DONE")
+        while True:
+            line = await asyncio.wait_for(self._readline(), 30)
+            if line.startswith(tag.encode() + b' '):
+                return got_mail
+
+    async def logout(self) -> None:
+        if self.writer is None:
+            return
+        try:
+            await asyncio.wait_for(self.command("LOGOUT"), 5)
+        except Exception:
+            pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+@dataclass
+class Mailbox:
+    user_id: int
+    host: str
+    username: str
+    password: str
+    folder: str = 'INBOX'
+    port: int = 993
+
+
+class UidStore:
+    """
+    Last queued UID per mailbox folder and UIDVALIDITY, in the database
+    (MailboxCursor) so a restarted listener catches up on what arrived
+    while it was down
+    """
+
+    def _lookup(self, mailbox: Mailbox, uidvalidity) -> dict:
+        return {'user_id': mailbox.user_id, 'folder': mailbox.folder, 'uidvalidity': uidvalidity or 0}
+
+    async def get(self, mailbox: Mailbox, uidvalidity) -> Optional[int]:
+        from .models import MailboxCursor
+        cursor = await MailboxCursor.objects.filter(**self._lookup(mailbox, uidvalidity)).afirst()
+        return cursor.last_uid if cursor is not None else None
+
+    async def set(self, mailbox: Mailbox, uidvalidity, uid: int) -> None:
+        from .models import MailboxCursor
+        await MailboxCursor.objects.aupdate_or_create(**self._lookup(mailbox, uidvalidity), defaults={'last_uid': uid})
+
+
+class MailboxWatcher:
+    """Keeps one mailbox folder in IDLE and enqueues new UIDs"""
+
+    def __init__(self, mailbox: Mailbox, enqueue: Enqueue, uid_store=None,
+                 ssl_context: Optional[ssl.SSLContext] = None, idle_timeout: float = IDLE_TIMEOUT):
+        self.mailbox = mailbox
+        self.enqueue = enqueue
+        self.uid_store = uid_store or UidStore()
+        self.ssl_context = ssl_context
+        self.idle_timeout = idle_timeout
+        self.last_uid: Optional[int] = None
+
+    def __repr__(self):
+        return f"<MailboxWatcher user={self.mailbox.user_id} {self.mailbox.host}/{self.mailbox.folder}>"
+
+    async def run(self) -> None:
+        """Watch forever, reconnecting with backoff"""
+        failures = 0
+        while True:
+            try:
+                await self.watch_once()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = RECONNECT_DELAYS[min(failures, len(RECONNECT_DELAYS) - 1)]
+                failures += 1
+                logger.warning(f"{self!r}: {str(e)}; reconnecting in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def watch_once(self) -> None:
+        """One connection's lifetime: select, catch up, then IDLE until the connection ends"""
+        client = AsyncImapClient(self.mailbox.host, self.mailbox.port, self.ssl_context)
+        try:
+            await client.connect()
+            await client.login(self.mailbox.username, self.mailbox.password)
+            uidvalidity, uidnext = await client.select(self.mailbox.folder)
+
+            self.last_uid = await self.uid_store.get(self.mailbox, uidvalidity)
+            if self.last_uid is None:
+                # First start for this folder: only mail from now on, the
+                # scheduled sync covers what is already there
+                self.last_uid = (uidnext or 1) - 1
+                await self.uid_store.set(self.mailbox, uidvalidity, self.last_uid)
+            else:
+                await self._enqueue_new(client, uidvalidity)
+
+            logger.info(f"{self!r}: idling from UID {self.last_uid}")
+            while True:
+                await client.idle(self.idle_timeout)
+                # Also searched after a quiet timeout, in case a notification was missed
+                await self._enqueue_new(client, uidvalidity)
+        finally:
+            await client.logout()
+
+    async def _enqueue_new(self, client: AsyncImapClient, uidvalidity) -> None:
+        uids = await client.uids_after(self.last_uid)
+        if not uids:
+            return
+        await self.enqueue(self.mailbox.user_id, self.mailbox.folder, uids)
+        self.last_uid = uids[-1]
+        await self.uid_store.set(self.mailbox, uidvalidity, self.last_uid)
+        logger.info(f"{self!r}: queued {len(uids)} new messages")
+
+
+async def celery_enqueue(user_id: int, folder: str, uids: List[int]) -> None:
+    """Queue ingest_mailbox_uids without blocking the event loop on the broker"""
+    from .tasks import ingest_mailbox_uids
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, lambda: ingest_mailbox_uids.delay(user_id, folder, uids))
+
+
+class IdleListener:
+    """Runs one MailboxWatcher coroutine per mailbox"""
+
+    def __init__(self, mailboxes: List[Mailbox], enqueue: Enqueue = celery_enqueue, **watcher_options):
+        self.watchers = [MailboxWatcher(mailbox, enqueue, **watcher_options) for mailbox in mailboxes]
+
+    async def run(self) -> None:
+        if not self.watchers:
+            logger.warning("No mailboxes to watch")
+            return
+        logger.info(f"Watching {len(self.watchers)} mailbox folders")
+        await asyncio.gather(*(watcher.run() for watcher in self.watchers))
+
+
+def mailboxes_from_configs(configs, folders=('INBOX',), port: int = 993) -> List[Mailbox]:
+    """Mailbox entries for EmailConfiguration rows, one per folder"""
+    return [
+        Mailbox(
+            user_id=config.user_id,
+            host=config.email_host,
+            username=config.email_username,
+            password=config.email_password,
+            folder=folder,
+            port=port
+        )
+        for config in configs
+        for folder in folders
+    ]
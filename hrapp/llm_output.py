@@ -0,0 +1,160 @@
+# hrapp/llm_output.py
+"""
+Parsing and validation of LLM extraction responses.
+
+Backends ask for schema-constrained JSON (Gemini's response_schema, a
+JSON schema for local models), both built from CandidateFields, but models still wrap it in ```json fences, add a sentence around
+it or leave a trailing comma. `parse_candidate_fields` validates the raw
+text against CandidateFields with pydantic's JSON parser first and only
+when that fails extracts the outermost object and repairs the usual
+mistakes before validating again. Outcomes are counted per backend in
+hrmatcher_llm_parse_total (ok/repaired/failed); every "failed" is a paid
+call whose answer was thrown away.
+"""
+import re
+from typing import List
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+from .metrics import REGISTRY
+
+LLM_PARSE = REGISTRY.counter(
+    'hrmatcher_llm_parse_total',
+    'LLM extraction responses by backend and parse result (ok/repaired/failed)',
+    ['backend', 'result']
+)
+
+FENCE_RE = re.compile(r'```(?:json|JSON)?\s*(.*?)```', re.DOTALL)
+TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+PY_LITERALS_RE = re.compile(r'(?<=[:\[,\s])(True|False|None)(?=\s*[,}\]])')
+LINE_COMMENT_RE = re.compile(r'^\s*//.*$', re.MULTILINE)
+# 'single quoted' keys and values, when the quoted text has no quotes of its own
+SINGLE_QUOTED_KEY_RE = re.compile(r"(?<=[{,\s])'([^'\"]*)'(?=\s*:)")
+SINGLE_QUOTED_VALUE_RE = re.compile(r"(?<=[:\[,])(\s*)'([^'\"]*)'")
+NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+PY_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+
+class LLMOutputError(ValueError):
+    pass
+
+
+class CandidateFields(BaseModel):
+    """What extractor backends ask the model for"""
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
+    name: str = 'Unknown'
+    email: str = ''
+    phone: str = ''
+    skills: List[str] = []
+    experience: float = 0.0
+
+    @field_validator('name', 'email', 'phone', mode='before')
+    @classmethod
+    def _text(cls, value):
+        if value is None:
+            return ''
+        return value if isinstance(value, str) else str(value)
+
+    @field_validator('skills', mode='before')
+    @classmethod
+    def _skills(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [skill.strip() for skill in value.split(',') if skill.strip()]
+        return [str(skill) for skill in value if skill is not None]
+
+    @field_validator('experience', mode='before')
+    @classmethod
+    def _experience(cls, value):
+        # "5 years", "3+" and null all turn up in practice
+        if value is None or value == '':
+            return 0.0
+        if isinstance(value, str):
+            match = NUMBER_RE.search(value)
+            return float(match.group()) if match else 0.0
+        return value
+
+
+CANDIDATE_FIELDS_SCHEMA = CandidateFields.model_json_schema()
+
+# Keys of the OpenAPI subset Gemini's response_schema accepts (no title/default)
+RESPONSE_SCHEMA_KEYS = ('type', 'format', 'description', 'nullable', 'enum', 'properties', 'required', 'items')
+
+
+def response_schema(schema: dict) -> dict:
+    """A pydantic JSON schema cut down to what Gemini's response_schema accepts, every property required"""
+    reduced = {key: value for key, value in schema.items() if key in RESPONSE_SCHEMA_KEYS}
+    if 'properties' in reduced:
+        reduced['properties'] = {name: response_schema(field) for name, field in reduced['properties'].items()}
+        reduced['required'] = list(reduced['properties'])
+    if 'items' in reduced:
+        reduced['items'] = response_schema(reduced['items'])
+    return reduced
+
+
+CANDIDATE_FIELDS_RESPONSE_SCHEMA = response_schema(CANDIDATE_FIELDS_SCHEMA)
+
+
+def outermost_object(text: str) -> str:
+    """The first balanced {...} in text, skipping braces inside strings"""
+    start = text.find('{')
+    if start < 0:
+        raise LLMOutputError("No JSON object in response")
+    open_brackets = []
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            open_brackets.append('}' if char == '{' else ']')
+        elif char in '}]' and open_brackets:
+            open_brackets.pop()
+            if not open_brackets:
+                return text[start:i + 1]
+    # Cut off mid-object (e.g. by max_output_tokens): close what is open
+    return text[start:] + ('"' if in_string else '') + ''.join(reversed(open_brackets))
+
+
+def repair_json(text: str) -> str:
+    """Best-effort fix of fenced, wrapped or slightly malformed JSON"""
+    fenced = FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    text = outermost_object(text.translate(SMART_QUOTES))
+    text = LINE_COMMENT_RE.sub('', text)
+    text = SINGLE_QUOTED_KEY_RE.sub(r'"\1"', text)
+    text = SINGLE_QUOTED_VALUE_RE.sub(r'\1"\2"', text)
+    text = PY_LITERALS_RE.sub(lambda match: PY_LITERALS[match.group(1)], text)
+    return TRAILING_COMMA_RE.sub(r'\1', text)
+
+
+def parse_candidate_fields(response_text: str, backend: str = '') -> CandidateFields:
+    """Validated fields from a model response, or LLMOutputError"""
+    if not response_text:
+        LLM_PARSE.inc(backend=backend, result='failed')
+        raise LLMOutputError("Empty response")
+    try:
+        fields = CandidateFields.model_validate_json(response_text)
+        LLM_PARSE.inc(backend=backend, result='ok')
+        return fields
+    except ValidationError:
+        pass
+    try:
+        fields = CandidateFields.model_validate_json(repair_json(response_text))
+    except (ValidationError, LLMOutputError) as e:
+        LLM_PARSE.inc(backend=backend, result='failed')
+        raise LLMOutputError(f"Unparseable {backend or 'LLM'} response: {str(e)[:200]}") from e
+    LLM_PARSE.inc(backend=backend, result='repaired')
+    return fields
@@ -0,0 +1,103 @@
+# hrapp/log_utils.py
+"""
+Logging helpers for hot paths.
+
+`hot_log` is for per-candidate / per-skill logging inside matching loops:
+it returns immediately unless DEBUG is enabled for the logger, only emits
+one call in HOT_PATH_LOG_SAMPLE_RATE, and defers all string formatting to
+the handler, so callers can pass lists and dicts as-is.
+
+`QueueListenerHandler` moves file and console I/O off the request thread.
+"""
+import atexit
+import itertools
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List
+
+DEFAULT_SAMPLE_RATE = 100
+
+_sample_counters: Dict[str, itertools.count] = {}
+
+
+def _sample_rate() -> int:
+    try:
+        from django.conf import settings
+        return max(1, int(getattr(settings, 'HOT_PATH_LOG_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)))
+    except Exception:
+        return DEFAULT_SAMPLE_RATE
+
+
+def hot_log(logger: logging.Logger, event: str, level: int = logging.DEBUG, **fields) -> None:
+    """Level-gated, sampled, structured log call for hot loops.
+
+    The record message is `event key=value ...` and the fields are also
+    attached to the record as `event` / `fields` for structured handlers.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    counter = _sample_counters.get(event)
+    if counter is None:
+        counter = _sample_counters.setdefault(event, itertools.count())
+    if next(counter) % _sample_rate():
+        return
+    logger.log(level, '%s %s', event, _Fields(fields), extra={'event': event, 'fields': fields})
+
+
+class _Fields:
+    """Formats key=value pairs only if the record is actually written"""
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(f'{key}={value!r}' for key, value in self.fields.items())
+
+
+class QueueListenerHandler(QueueHandler):
+    """QueueHandler that owns a QueueListener feeding the named handlers.
+
+    Usable from settings.LOGGING on any Python 3 version:
+
+        'queue': {
+            '()': 'hrapp.log_utils.QueueListenerHandler',
+            'handlers': ['console', 'file'],
+        }
+
+    The target handlers are looked up by name on first use, after
+    dictConfig has created them, and the listener thread is stopped at exit.
+    """
+
+    def __init__(self, handlers: List[str], respect_handler_level: bool = True):
+        super().__init__(queue.SimpleQueue())
+        self._handler_names = list(handlers)
+        self._respect_handler_level = respect_handler_level
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        targets = [
+            handler for handler in (_get_handler(name) for name in self._handler_names)
+            if handler is not None
+        ]
+        self._listener = QueueListener(
+            self.queue, *targets, respect_handler_level=self._respect_handler_level
+        )
+        self._listener.start()
+        atexit.register(self._listener.stop)
+
+    def emit(self, record):
+        if self._listener is None:
+            with self._start_lock:
+                if self._listener is None:
+                    self._start()
+        super().emit(record)
+
+
+def _get_handler(name: str):
+    if hasattr(logging, 'getHandlerByName'):  # Python 3.12+
+        return logging.getHandlerByName(name)
+    return logging._handlers.get(name)
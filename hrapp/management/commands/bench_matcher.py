@@ -0,0 +1,370 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+SYNTHETIC_SKILLS = [
+    'Python', 'Django', 'JavaScript', 'React', 'SQL', 'AWS', 'Docker',
+    'Kubernetes', 'Java', 'Spring', 'Node.js', 'Excel', 'Salesforce',
+    'Machine Learning', 'Pandas', 'Figma', 'Git', 'Linux', 'Sales', 'Marketing'
+]
+FIRST_NAMES = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Rahul', 'Isha']
+LAST_NAMES = ['Sharma', 'Gupta', 'Singh', 'Patel', 'Verma', 'Iyer', 'Reddy', 'Nair', 'Das', 'Mehta']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+DEGREES = ['Bachelor of Technology', 'MBA', 'Master of Science', 'B.Tech', 'BSc Computer Science']
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def synthetic_resume_text(rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    skills = rng.sample(SYNTHETIC_SKILLS, rng.randint(3, 8))
+    years = rng.randint(0, 15)
+    jobs = []
+    year = 2025
+    for _ in range(rng.randint(1, 4)):
+        start = year - rng.randint(1, 4)
+        jobs.append(
+            f"Software Engineer at Company {rng.randint(1, 999)}\n"
+            f"{rng.choice(MONTHS)} {start} - {rng.choice(MONTHS)} {year}\n"
+            f"- Built services using {', '.join(rng.sample(skills, min(2, len(skills))))}"
+        )
+        year = start
+    return (
+        f"{name}\n"
+        f"{name.lower().replace(' ', '.')}@example.com | +91 98{rng.randint(10000000, 99999999)}\n\n"
+        f"Professional with {years} years of experience\n\n"
+        f"Skills: {', '.join(skills)}\n\n"
+        f"Work History\n" + "\n".join(jobs) + "\n\n"
+        f"Education\n{rng.choice(DEGREES)}, University of Delhi\n"
+    )
+
+
+def write_synthetic_corpus(directory, count, seed):
+    """Write `count` resumes spread evenly over .txt, .docx and .pdf"""
+    from docx import Document
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        text = synthetic_resume_text(rng)
+        kind = ('txt', 'docx', 'pdf')[i % 3]
+        path = os.path.join(directory, f"synthetic_{i:06d}.{kind}")
+        if kind == 'txt':
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        elif kind == 'docx':
+            document = Document()
+            for line in text.split('\n'):
+                document.add_paragraph(line)
+            document.save(path)
+        else:
+            pdf = canvas.Canvas(path, pagesize=letter)
+            y = 750
+            for line in text.split('\n'):
+                pdf.drawString(50, y, line)
+                y -= 14
+            pdf.save()
+        paths.append(path)
+    return paths
+
+
+class Stage:
+    """Collects per-item latencies and the memory cost of one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.rss_growth_mb = None
+        self.peak_alloc_mb = None
+
+    def time(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    @contextmanager
+    def measure(self):
+        """
+        Record how far the stage raised the process's peak RSS (0 when it
+        stayed under an earlier stage's peak) and, with tracemalloc running,
+        its own peak Python allocations
+        """
+        rss_before = peak_rss_mb()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            allocated_before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield self
+        finally:
+            if rss_before is not None:
+                self.rss_growth_mb = round(peak_rss_mb() - rss_before, 1)
+            if tracing:
+                self.peak_alloc_mb = round((tracemalloc.get_traced_memory()[1] - allocated_before) / (1024 * 1024), 2)
+
+    def report(self):
+        values = sorted(self.latencies)
+        total = sum(values)
+        return {
+            'items': len(values),
+            'total_seconds': round(total, 6),
+            'throughput_per_second': round(len(values) / total, 2) if total else None,
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+            'rss_growth_mb': self.rss_growth_mb,
+            'peak_alloc_mb': self.peak_alloc_mb,
+        }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the resume matching pipeline stage by stage and print JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=300,
+                            help='Number of synthetic resumes to generate (PDF/DOCX/TXT)')
+        parser.add_argument('--corpus-dir', help='Use resumes from this directory instead of generating them')
+        parser.add_argument('--no-media', action='store_true',
+                            help='Leave out the real resumes in MEDIA_ROOT/resumes')
+        parser.add_argument('--skills', default='python,django,sql,react,aws',
+                            help='Comma separated skills to search for')
+        parser.add_argument('--min-experience', type=int, default=2)
+        parser.add_argument('--position', default='software engineer')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report to this file as well')
+        parser.add_argument('--extractor', default='regex',
+                            help='Candidate field extractor backend for the skill_match stage '
+                                 '(regex, gemini, local, stub or a dotted path)')
+        parser.add_argument('--compare-extractors', action='store_true',
+                            help='Also time the per-field extract_* helpers and check they agree '
+                                 'with the single-pass extract_candidate_info')
+        parser.add_argument('--trace-memory', action='store_true',
+                            help='Report each stage\'s peak Python allocations with tracemalloc '
+                                 '(slows every stage down, so latencies are not comparable)')
+
+    def handle(self, *args, **options):
+        from hrapp.utils import extract_text_from_resume, extract_candidate_info
+        from hrapp.views import calculate_ats_score_stored
+        from hrapp.text_store import TextStore
+        from hrapp.extractors import EXTRACTOR_COST, get_backend
+        from hrapp.export_utils import export_to_excel, export_to_csv, build_pdf_report
+
+        skills = [s.strip().lower() for s in options['skills'].split(',') if s.strip()]
+        job_requirements = {
+            'required_skills': skills,
+            'min_experience': options['min_experience'],
+            'job_title_keywords': [options['position'].lower()],
+            'preferred_skills': []
+        }
+
+        temp_dir = None
+        files = []
+        if options['corpus_dir']:
+            files.extend(
+                os.path.join(options['corpus_dir'], name)
+                for name in sorted(os.listdir(options['corpus_dir']))
+                if name.lower().endswith(('.pdf', '.docx', '.txt'))
+            )
+        elif options['synthetic']:
+            temp_dir = tempfile.mkdtemp(prefix='bench_matcher_')
+            files.extend(write_synthetic_corpus(temp_dir, options['synthetic'], options['seed']))
+        if not options['no_media']:
+            from hrapp.catalog import iter_resumes, absolute_path
+            files.extend(
+                absolute_path(document.path)
+                for document in iter_resumes(extensions=('.pdf', '.docx', '.txt'), all_users=True)
+            )
+
+        stages = {name: Stage(name) for name in (
+            'extraction', 'candidate_info', 'skill_match', 'text_store', 'scoring', 'ranking',
+            'export_excel', 'export_csv', 'export_pdf'
+        )}
+        # Scoring reads resumes from a mapped text store, as the search views
+        # do; this one lives in a scratch directory
+        store_dir = tempfile.mkdtemp(prefix='bench_matcher_store_')
+        if options['trace_memory']:
+            tracemalloc.start()
+
+        try:
+            texts = []
+            with stages['extraction'].measure():
+                for path in files:
+                    text = stages['extraction'].time(extract_text_from_resume, path)
+                    if text:
+                        texts.append((path, text))
+
+            with stages['candidate_info'].measure():
+                for _, text in texts:
+                    stages['candidate_info'].time(extract_candidate_info, text)
+
+            if options['compare_extractors']:
+                extractor_check = self._compare_extractors(texts, stages)
+
+            extractor = get_backend(options['extractor'])
+            candidates = []
+            with stages['skill_match'].measure():
+                for path, text in texts:
+                    candidates.append((path, stages['skill_match'].time(extractor.extract, text, skills)))
+
+            with override_settings(RESUME_TEXT_STORE_DIR=store_dir):
+                store = TextStore()
+            digests = [hashlib.sha256(text.encode('utf-8')).hexdigest() for _, text in texts]
+            with stages['text_store'].measure():
+                for digest, (_, text) in zip(digests, texts):
+                    stages['text_store'].time(store.append, digest, text)
+
+            results = []
+            with stages['scoring'].measure():
+                for digest, (path, _), (_, candidate) in zip(digests, texts, candidates):
+                    score = stages['scoring'].time(
+                        lambda: calculate_ats_score_stored(store.get(digest), job_requirements)
+                    )
+                    if not score['matched_skills']:
+                        continue
+                    results.append({
+                        'name': candidate['name'],
+                        'score': score['total_score'],
+                        'matched_skills': score['matched_skills'],
+                        'missing_skills': score['missing_skills'],
+                        'experience': candidate['experience'],
+                        'email': candidate['email'],
+                        'phone': candidate['phone'],
+                        'filename': os.path.basename(path),
+                    })
+
+            with stages['ranking'].measure():
+                stages['ranking'].time(results.sort, key=lambda x: x['score'], reverse=True)
+
+            def consume(response):
+                # Export bodies are async iterators (served under ASGI)
+                async def drain():
+                    async for _ in response.streaming_content:
+                        pass
+                asyncio.run(drain())
+
+            with stages['export_excel'].measure():
+                stages['export_excel'].time(lambda: consume(export_to_excel(results, streaming=True)))
+            with stages['export_csv'].measure():
+                stages['export_csv'].time(lambda: consume(export_to_csv(results)))
+            with stages['export_pdf'].measure():
+                stages['export_pdf'].time(build_pdf_report, results, BytesIO())
+        finally:
+            if options['trace_memory']:
+                tracemalloc.stop()
+            shutil.rmtree(store_dir, ignore_errors=True)
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        report = {
+            'meta': {
+                'commit': self._git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'files': len(files),
+                'extracted': len(texts),
+                'matched': len(results),
+                'synthetic': 0 if options['corpus_dir'] else options['synthetic'],
+                'seed': options['seed'],
+                'skills': skills,
+                'extractor': options['extractor'],
+                'extractor_cost_usd': EXTRACTOR_COST.value(backend=extractor.name),
+            },
+            'stages': {name: stage.report() for name, stage in stages.items()},
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        if options['compare_extractors']:
+            report['extractor_check'] = extractor_check
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    @staticmethod
+    def _compare_extractors(texts, stages):
+        """Time the legacy per-field helpers and diff them against the single pass"""
+        from hrapp.utils import (
+            extract_candidate_info,
+            extract_name_from_resume,
+            extract_email_from_resume,
+            extract_phone,
+            calculate_total_experience,
+            extract_skills_section,
+            extract_education,
+        )
+
+        def legacy(text):
+            return {
+                'name': extract_name_from_resume(text),
+                'email': extract_email_from_resume(text),
+                'phone': extract_phone(text),
+                'experience': calculate_total_experience(text),
+                'skills': extract_skills_section(text),
+                'education': extract_education(text)
+            }
+
+        stages['candidate_info_legacy'] = Stage('candidate_info_legacy')
+        mismatches = []
+        with stages['candidate_info_legacy'].measure():
+            for path, text in texts:
+                expected = stages['candidate_info_legacy'].time(legacy, text)
+                actual = extract_candidate_info(text)
+                # skills come back from a set, so their order is arbitrary
+                expected['skills'] = sorted(expected['skills'])
+                actual['skills'] = sorted(actual['skills'])
+                if expected != actual:
+                    mismatches.append({
+                        'file': os.path.basename(path),
+                        'fields': sorted(k for k in expected if expected[k] != actual[k])
+                    })
+        return {'compared': len(texts), 'mismatches': mismatches}
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+            ).decode().strip()
+        except Exception:
+            return None
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hrmatcher.celery import app, worker_argv
+
+
+class Command(BaseCommand):
+    help = 'Run a Celery worker for one queue with the pool, concurrency and prefetch set in WORKER_POOLS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queue', choices=list(settings.WORKER_POOLS))
+        parser.add_argument('--concurrency', type=int, help='Override the configured concurrency')
+
+    def handle(self, *args, **options):
+        argv = worker_argv(options['queue'], options['concurrency'])
+        self.stdout.write(f"celery -A hrmatcher {' '.join(argv)}")
+        app.worker_main(argv)
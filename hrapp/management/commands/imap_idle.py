@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import ssl
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hrapp.imap_idle import IDLE_TIMEOUT, IdleListener, mailboxes_from_configs
+from hrapp.models import EmailConfiguration
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run the IMAP IDLE listener: one connection per configured mailbox, new mail is ingested as it arrives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--folder', action='append', dest='folders',
+                            help='Folder to watch (repeatable, default IMAP_SYNC_FOLDERS)')
+        parser.add_argument('--user-id', type=int, action='append', dest='user_ids',
+                            help='Only watch these users\' mailboxes (repeatable)')
+        parser.add_argument('--port', type=int, default=993)
+        parser.add_argument('--no-ssl', action='store_true',
+                            help='Plain-text connection, e.g. to a local test IMAP server')
+        parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT,
+                            help='Seconds before an IDLE is re-issued')
+
+    def handle(self, *args, **options):
+        configs = EmailConfiguration.objects.all()
+        if options['user_ids']:
+            configs = configs.filter(user_id__in=options['user_ids'])
+        mailboxes = mailboxes_from_configs(
+            list(configs),
+            folders=options['folders'] or settings.IMAP_SYNC_FOLDERS,
+            port=options['port']
+        )
+
+        listener = IdleListener(
+            mailboxes,
+            ssl_context=None if options['no_ssl'] else ssl.create_default_context(),
+            idle_timeout=options['idle_timeout']
+        )
+        self.stdout.write(f"Watching {len(mailboxes)} mailbox folders")
+        try:
+            asyncio.run(listener.run())
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
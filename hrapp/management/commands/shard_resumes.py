@@ -0,0 +1,94 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from hrapp.catalog import RESUME_EXTENSIONS, ResumeIngest, resume_dir
+from hrapp.models import ResumeDocument
+from hrapp.text_cache import drop_resume_text
+
+
+class Command(BaseCommand):
+    help = ('Move resumes from the flat MEDIA_ROOT/resumes directory into the sharded layout, '
+            'catalog them and group duplicate copies')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True,
+                            help='Username that owns the resumes being moved. Files and catalog rows '
+                                 'without an owner are moved into their partition')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report what would be moved')
+        parser.add_argument('--delete-duplicates', action='store_true',
+                            help='Also remove near-duplicate files (and their catalog rows)')
+
+    def handle(self, *args, **options):
+        directory = resume_dir()
+        if not os.path.isdir(directory):
+            self.stdout.write(f"No resume directory at {directory}")
+            return
+
+        try:
+            user_id = User.objects.get(username=options['user']).id
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']}")
+
+        dry_run = options['dry_run']
+        ingest = ResumeIngest(user_id)
+        relocated = moved = removed = duplicates = 0
+
+        # Rows catalogued before sharding (or before partitioning) still
+        # point at their old paths
+        for document in ResumeDocument.objects.filter(user__isnull=True).iterator():
+            if not os.path.exists(ingest.path_for(document)):
+                self.stderr.write(f"Missing file for catalogued resume {document.path}")
+                continue
+            relocated += 1
+            if dry_run:
+                continue
+            if ResumeDocument.objects.filter(user_id=user_id, sha256=document.sha256).exists():
+                os.remove(ingest.path_for(document))
+                drop_resume_text(document)
+                document.delete()
+                continue
+            drop_resume_text(document)
+            document.user_id = user_id
+            document.save(update_fields=['user'])
+            ingest.relocate(document)
+
+        with os.scandir(directory) as entries:
+            flat_files = sorted(
+                entry.path for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(RESUME_EXTENSIONS)
+            )
+
+        for filepath in flat_files:
+            if dry_run:
+                self.stdout.write(f"Would move {os.path.basename(filepath)}")
+                moved += 1
+                continue
+
+            document, created = ingest.adopt(filepath)
+            if created:
+                moved += 1
+            else:
+                removed += 1
+                self.stdout.write(f"{os.path.basename(filepath)}: identical to {document.filename}, removed")
+                continue
+
+            if document.duplicate_of_id is not None:
+                duplicates += 1
+                self.stdout.write(f"{document.filename} -> {document.duplicate_of.filename}")
+                if options['delete_duplicates']:
+                    os.remove(ingest.path_for(document))
+                    drop_resume_text(document)
+                    document.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would move' if dry_run else 'Moved'} {moved} files, relocated {relocated} catalogued files, "
+            f"removed {removed} identical copies, found {duplicates} near-duplicates"
+        ))
+
+        # Searches never see ownerless rows, so don't leave any behind silently
+        ownerless = ResumeDocument.objects.filter(user__isnull=True).count()
+        if ownerless and not dry_run:
+            raise CommandError(f"{ownerless} catalogued resumes still have no owner (their files are missing)")
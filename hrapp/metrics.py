@@ -0,0 +1,228 @@
+# hrapp/metrics.py
+"""
+Lightweight in-process instrumentation for the matching pipeline.
+
+Counters and histograms live in a module-level registry and are rendered
+in the Prometheus text format by the /metrics view. Each process (web
+worker, Celery worker) keeps its own numbers, so scrape every process
+you care about.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds, from a cached regex scan up to a slow IMAP sync
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {series[-1]}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        lines.extend(_cache_hit_ratio_lines())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'hrmatcher_stage_duration_seconds',
+    'Wall time spent in each matching pipeline stage',
+    ['stage']
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'hrmatcher_stage_errors_total',
+    'Exceptions raised out of a pipeline stage',
+    ['stage']
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'hrmatcher_cache_requests_total',
+    'Cache lookups by cache name and result (hit/miss)',
+    ['cache', 'result']
+)
+IMAP_BYTES_FETCHED = REGISTRY.counter(
+    'hrmatcher_imap_bytes_fetched_total',
+    'Raw message bytes downloaded from IMAP'
+)
+RESUMES_FETCHED = REGISTRY.counter(
+    'hrmatcher_resumes_fetched_total',
+    'Resume attachments saved from email'
+)
+RESUMES_PREFILTERED = REGISTRY.counter(
+    'hrmatcher_resumes_prefiltered_total',
+    'Resumes checked against skill signatures before scoring, by result (kept/dropped)',
+    ['result']
+)
+
+
+def _cache_hit_ratio_lines() -> List[str]:
+    caches = sorted({key[0] for key in CACHE_REQUESTS._values})
+    if not caches:
+        return []
+    lines = [
+        '# HELP hrmatcher_cache_hit_ratio Share of cache lookups served from cache',
+        '# TYPE hrmatcher_cache_hit_ratio gauge',
+    ]
+    for name in caches:
+        hits = CACHE_REQUESTS.value(cache=name, result='hit')
+        total = hits + CACHE_REQUESTS.value(cache=name, result='miss')
+        lines.append(f'hrmatcher_cache_hit_ratio{{cache="{_escape(name)}"}} {hits / total if total else 0.0}')
+    return lines
+
+
+@contextmanager
+def timer(stage: str):
+    """Time a block of code and record it under `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def timed(stage: str):
+    """Decorator form of `timer`"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(stage: str, iterable: Iterable):
+    """
+    Yield from `iterable`, recording under `stage` the time spent producing
+    its items (for streamed responses, where the work happens after the
+    view has returned; time the consumer spends between items is excluded)
+    """
+    elapsed = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            yield item
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
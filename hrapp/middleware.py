@@ -17,7 +17,8 @@ class SecurityMiddleware(MiddlewareMixin):
         '/admin/',
         '/static/',
         '/media/',
-        '/favicon.ico'
+        '/favicon.ico',
+        '/metrics'
     ]
 
     def process_request(self, request):
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrapp', '0005_merge_20250519_0035'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.CharField(blank=True, default='', max_length=255)),
+                ('skills', models.TextField(blank=True, default='')),
+                ('min_experience', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job_requirement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='match_results', to='hrapp.jobrequirement')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='match_results', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MatchResultCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('name', models.CharField(blank=True, default='', max_length=255)),
+                ('score', models.FloatField(default=0.0)),
+                ('experience', models.FloatField(default=0.0)),
+                ('email', models.CharField(blank=True, default='', max_length=255)),
+                ('phone', models.CharField(blank=True, default='', max_length=50)),
+                ('matched_skills', models.JSONField(default=list)),
+                ('missing_skills', models.JSONField(default=list)),
+                ('filename', models.CharField(blank=True, default='', max_length=255)),
+                ('resume_url', models.CharField(blank=True, default='', max_length=500)),
+                ('match_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidates', to='hrapp.matchresult')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['match_result', 'rank'], name='hrapp_mrc_result_rank_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrapp', '0006_matchresult_matchresultcandidate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('simhash', models.BigIntegerField(blank=True, null=True)),
+                ('filename', models.CharField(max_length=255, unique=True)),
+                ('path', models.CharField(max_length=500)),
+                ('sender_email', models.CharField(blank=True, default='', max_length=255)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='hrapp.resumedocument')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrapp', '0007_resumedocument'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumedocument',
+            name='filename',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='resumedocument',
+            name='path',
+            field=models.CharField(max_length=500, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='resumedocument',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
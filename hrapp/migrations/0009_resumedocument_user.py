@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrapp', '0008_resumedocument_sharded_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumedocument',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resume_documents', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='resumedocument',
+            index=models.Index(fields=['user', 'sha256'], name='hrapp_resdoc_user_sha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumedocument',
+            index=models.Index(fields=['user', 'duplicate_of'], name='hrapp_resdoc_user_dup_idx'),
+        ),
+    ]
@@ -63,3 +63,132 @@ class ResumeEmail(models.Model):
     def __str__(self):
         return f"Resume from {self.sender_email} - {self.subject[:50]}..."
      
+
+class MatchResult(models.Model):
+    """One stored resume search, so results can be exported by ID"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='match_results',
+        null=True,
+        blank=True
+    )
+    job_requirement = models.ForeignKey(
+        JobRequirement,
+        on_delete=models.SET_NULL,
+        related_name='match_results',
+        null=True,
+        blank=True
+    )
+    position = models.CharField(max_length=255, blank=True, default='')
+    skills = models.TextField(blank=True, default='')
+    min_experience = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Match result {self.pk} ({self.position or 'any position'})"
+
+    def save_candidates(self, candidates, batch_size=1000):
+        """Persist result rows in ranked order"""
+        MatchResultCandidate.objects.bulk_create(
+            (
+                MatchResultCandidate(
+                    match_result=self,
+                    rank=rank,
+                    name=candidate.get('name') or '',
+                    score=candidate.get('score') or 0,
+                    experience=candidate.get('experience') or 0,
+                    email=candidate.get('email') or '',
+                    phone=candidate.get('phone') or '',
+                    matched_skills=list(candidate.get('matched_skills') or []),
+                    missing_skills=list(candidate.get('missing_skills') or []),
+                    filename=candidate.get('filename') or candidate.get('resume') or '',
+                    resume_url=candidate.get('resume_url') or ''
+                )
+                for rank, candidate in enumerate(candidates, start=1)
+            ),
+            batch_size=batch_size
+        )
+
+    def iter_candidates(self, chunk_size=2000):
+        """Stream stored rows as plain dicts without loading the whole result set"""
+        return self.candidates.order_by('rank').values(
+            'name', 'score', 'experience', 'email', 'phone',
+            'matched_skills', 'missing_skills', 'filename', 'resume_url'
+        ).iterator(chunk_size=chunk_size)
+
+class MatchResultCandidate(models.Model):
+    match_result = models.ForeignKey(MatchResult, on_delete=models.CASCADE, related_name='candidates')
+    rank = models.PositiveIntegerField()
+    name = models.CharField(max_length=255, blank=True, default='')
+    score = models.FloatField(default=0.0)
+    experience = models.FloatField(default=0.0)
+    email = models.CharField(max_length=255, blank=True, default='')
+    phone = models.CharField(max_length=50, blank=True, default='')
+    matched_skills = models.JSONField(default=list)
+    missing_skills = models.JSONField(default=list)
+    filename = models.CharField(max_length=255, blank=True, default='')
+    resume_url = models.CharField(max_length=500, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['match_result', 'rank'], name='hrapp_mrc_result_rank_idx'),
+        ]
+        ordering = ['rank']
+
+class MailboxCursor(models.Model):
+    """Last UID the IMAP IDLE listener queued for a mailbox folder (UIDs are only valid per UIDVALIDITY)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mailbox_cursors')
+    folder = models.CharField(max_length=255)
+    uidvalidity = models.BigIntegerField(default=0)
+    last_uid = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'folder', 'uidvalidity'], name='hrapp_mailbox_cursor_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.folder} UID {self.last_uid} for user {self.user_id}"
+
+class ResumeDocument(models.Model):
+    """One stored resume file, with the hashes used to spot duplicate copies"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='resume_documents',
+        null=True,
+        blank=True
+    )
+    sha256 = models.CharField(max_length=64, db_index=True)
+    simhash = models.BigIntegerField(null=True, blank=True)
+    filename = models.CharField(max_length=255)  # Original attachment name
+    path = models.CharField(max_length=500, unique=True)  # Sharded path under MEDIA_ROOT
+    sender_email = models.CharField(max_length=255, blank=True, default='')
+    size = models.PositiveIntegerField(default=0)
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        related_name='duplicates',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'sha256'], name='hrapp_resdoc_user_sha_idx'),
+            models.Index(fields=['user', 'duplicate_of'], name='hrapp_resdoc_user_dup_idx'),
+        ]
+        ordering = ['id']
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def canonical(self):
+        return self.duplicate_of or self
@@ -0,0 +1,74 @@
+# hrapp/prefilter.py
+"""
+Trigram bloom signatures for ruling resumes out before scoring.
+
+Matching is by substring (`skill in resume_text`), so a token-level
+signature would wrongly drop "java" from a resume that only says
+"javascript". Instead every resume gets a fixed-size bloom filter of the
+byte trigrams in its lowercased text: if a skill occurs in the text, all of
+the skill's trigrams are in the filter, so a resume the filter rejects for
+every required skill cannot match any of them. There are no false
+negatives; false positives only cost a full scoring.
+
+Skills shorter than three bytes have no trigram and never rule a resume out.
+"""
+from typing import Iterable, List, Optional, Tuple
+
+SIGNATURE_BYTES = 2048
+SIGNATURE_BITS = SIGNATURE_BYTES * 8
+
+# Two multiplicative hashes of the 24-bit trigram value; with ~4,000
+# distinct trigrams in a typical resume about 40% of the bits are set, so a
+# 6-letter skill (4 trigrams) slips through a non-matching resume well
+# under 0.1% of the time
+_HASH_MULTIPLIERS = (0x9E3779B1, 0x85EBCA77)
+
+# (byte offset, bit mask) pairs that must all be set
+Probe = Tuple[Tuple[int, int], ...]
+
+
+def _bit_positions(trigram_value: int) -> Iterable[int]:
+    for multiplier in _HASH_MULTIPLIERS:
+        yield ((trigram_value * multiplier) >> 7) % SIGNATURE_BITS
+
+
+def _trigrams(blob: bytes) -> set:
+    return {int.from_bytes(blob[i:i + 3], 'little') for i in range(len(blob) - 2)}
+
+
+def trigram_signature(blob: bytes) -> bytes:
+    """Bloom filter of the distinct byte trigrams of lowercased UTF-8 text"""
+    signature = bytearray(SIGNATURE_BYTES)
+    for value in _trigrams(blob):
+        for bit in _bit_positions(value):
+            signature[bit >> 3] |= 1 << (bit & 7)
+    return bytes(signature)
+
+
+def skill_probe(skill: str) -> Optional[Probe]:
+    """Bits a resume containing this skill must have set, or None if it is too short to test"""
+    trigrams = _trigrams(skill.lower().encode('utf-8'))
+    if not trigrams:
+        return None
+    bits = {bit for value in trigrams for bit in _bit_positions(value)}
+    return tuple(sorted((bit >> 3, 1 << (bit & 7)) for bit in bits))
+
+
+class SkillPrefilter:
+    """Tests signatures against a search's required skills (probes built once per search)"""
+
+    def __init__(self, skills: Iterable[str]):
+        probes: List[Optional[Probe]] = [skill_probe(skill) for skill in skills]
+        # A skill with no trigrams could be anywhere, so nothing can be ruled out
+        self.probes = [] if None in probes else probes
+        self.active = bool(self.probes)
+
+    def may_match(self, buffer, offset: int = 0) -> bool:
+        """Whether the signature at buffer[offset:] might contain any of the skills"""
+        for probe in self.probes:
+            for byte, mask in probe:
+                if not buffer[offset + byte] & mask:
+                    break
+            else:
+                return True
+        return False
@@ -0,0 +1,88 @@
+# hrapp/profiles.py
+"""
+Cached candidate profiles.
+
+A profile is the part of a candidate's fields that doesn't depend on the
+search: name, email, phone and years of experience. The regex profile is
+cheap but still parses the whole text, and the LLM-enriched one costs a
+model call, so both are computed once per document (normally by the
+prewarm_resumes task right after ingest) and kept next to the cached text:
+
+    RESUME_TEXT_CACHE_DIR/user_<id>/<sha[0:2]>/<sha>.regex.json
+                                              /<sha>.llm.json
+
+Files rather than the Django cache, because the default cache is
+per-process and profiles written by a worker must be visible to the web
+process.
+"""
+import json
+import logging
+import os
+from typing import Optional
+
+from .metrics import record_cache
+from .text_cache import _write, get_resume_text, partition_dir
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ('name', 'email', 'phone', 'experience')
+PROFILE_SOURCES = ('llm', 'regex')
+
+
+def profile_path(document, source: str) -> str:
+    return os.path.join(partition_dir(document.user_id), document.sha256[:2], f"{document.sha256}.{source}.json")
+
+
+def cached_profile(document, source: Optional[str] = None) -> Optional[dict]:
+    """Stored profile from `source`, or the best one available (LLM first); None if not computed yet"""
+    for candidate in ((source,) if source else PROFILE_SOURCES):
+        try:
+            with open(profile_path(document, candidate), 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+        record_cache('resume_profile', True)
+        return profile
+    record_cache('resume_profile', False)
+    return None
+
+
+def _store(document, source: str, fields: dict) -> dict:
+    profile = {field: fields.get(field) or ('' if field != 'experience' else 0.0) for field in PROFILE_FIELDS}
+    profile['source'] = fields.get('source', source)
+    _write(profile_path(document, source), json.dumps(profile))
+    return profile
+
+
+def get_profile(document, text: Optional[str] = None) -> dict:
+    """Best cached profile, computing the regex one on a miss"""
+    profile = cached_profile(document)
+    if profile is not None:
+        return profile
+    from .extractors import extract_direct_search_fallback
+    if text is None:
+        text = get_resume_text(document)
+    return _store(document, 'regex', extract_direct_search_fallback(text or '', []))
+
+
+def enrich_profile(document, text: Optional[str] = None, queue: str = 'llm') -> Optional[dict]:
+    """LLM profile from the extractor configured for `queue`, stored unless the call fell back to regex"""
+    profile = cached_profile(document, 'llm')
+    if profile is not None:
+        return profile
+    from .extractors import get_extractor
+    if text is None:
+        text = get_resume_text(document)
+    if not text:
+        return None
+    fields = get_extractor(queue).extract(text, [])
+    if fields.get('source') == 'DirectSearch':
+        return None
+    return _store(document, 'llm', fields)
+
+
+def drop_profiles(document) -> None:
+    for source in PROFILE_SOURCES:
+        path = profile_path(document, source)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,74 @@
+# hrapp/results.py
+"""
+Compact match result records.
+
+A search can return tens of thousands of rows. CandidateResult is a
+slotted dataclass (no per-row __dict__), skill lists are tuples, and every
+skill name comes from one SkillVocabulary per search, so rows share
+references to a single string per skill instead of holding their own
+copies. ResultsResponse serialises the rows with orjson, which encodes
+dataclasses natively and is several times faster than the stdlib encoder
+behind JsonResponse.
+
+Rows keep dict-style `row['score']` / `row.get('email')` access, so
+collapse_candidates and MatchResult.save_candidates take them as they are.
+"""
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Tuple
+
+import orjson
+from django.http import HttpResponse
+
+
+class SkillVocabulary:
+    """One interned string per skill name for the rows of a search"""
+    __slots__ = ('_skills',)
+
+    def __init__(self, skills: Iterable[str] = ()):
+        self._skills: Dict[str, str] = {}
+        for skill in skills:
+            self.intern(skill)
+
+    def intern(self, skill: str) -> str:
+        return self._skills.setdefault(skill, skill)
+
+    def as_tuple(self, skills: Iterable[str]) -> Tuple[str, ...]:
+        return tuple(self.intern(skill) for skill in skills)
+
+
+@dataclass(slots=True)
+class CandidateResult:
+    name: str
+    score: float
+    matched_skills: Tuple[str, ...]
+    missing_skills: Tuple[str, ...]
+    experience: float
+    email: str = ''
+    phone: str = ''
+    filename: str = ''
+    resume_url: str = ''
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def dumps(data) -> bytes:
+    """orjson encoding for result rows, dataclasses or dicts"""
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ResultsResponse(HttpResponse):
+    """JsonResponse equivalent for result rows, encoded with orjson"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
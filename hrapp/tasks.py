@@ -10,28 +10,34 @@ from datetime import datetime, timedelta
 from email.header import decode_header
 from typing import List, Dict, Any, Optional, Union
 import ssl
+import uuid
 
 from celery import shared_task
 from django.conf import settings
 from django.core.cache import cache
 
+from hrapp.metrics import timed, IMAP_BYTES_FETCHED, RESUMES_FETCHED
+
 logger = logging.getLogger(__name__)
 
 @shared_task(bind=True, name="hrapp.tasks.process_resumes_from_email")
-def process_resumes_from_email(self, job_req_id):
-    """Process resumes from email with proper model imports"""
+def process_resumes_from_email(self, job_req_id, user_id):
+    """Match the user's mailbox resumes against a JobRequirement and store the ranking"""
     # Import models inside the task to avoid circular imports
-    from hrapp.models import JobRequirement, Candidate
+    from hrapp.models import JobRequirement, Candidate, MatchResult
+    from hrapp.dedup import Deduplicator
     from hrapp.utils import (
         extract_text_from_resume,
         extract_name_from_resume,
-        extract_skills_from_resume,
+        extract_experience,
+        match_skills,
         calculate_match_score
     )
     
     try:
         job_req = JobRequirement.objects.get(id=job_req_id)
-        resume_files = fetch_resumes_from_email()
+        job_skills = job_req.get_skills_list()
+        resume_files = fetch_resumes_from_email(user_id)
         
         if not resume_files:
             logger.info("No resumes found in email")
@@ -39,6 +45,7 @@ def process_resumes_from_email(self, job_req_id):
         
         matched_candidates = []
         total_files = len(resume_files)
+        dedup = Deduplicator()
         
         for i, resume_path in enumerate(resume_files, 1):
             try:
@@ -53,42 +60,60 @@ def process_resumes_from_email(self, job_req_id):
                     }
                 )
                 
-                # Process resume
+                # Process resume (each distinct candidate once)
                 text = extract_text_from_resume(resume_path)
                 if not text:
                     continue
+                if dedup.original_for_text(resume_path, text) is not None:
+                    continue
                     
                 name = extract_name_from_resume(text)
-                skills = extract_skills_from_resume(text)
-                score = calculate_match_score(skills, job_req.skills)
+                experience = extract_experience(text)
+                skills = match_skills(text.lower(), job_skills)[0]
+                score, matched_skills, missing_skills = calculate_match_score(
+                    resume_skills=skills,
+                    job_skills=job_skills,
+                    min_experience=job_req.min_experience,
+                    resume_experience=experience
+                )
                 
                 # Create candidate record
                 rel_path = os.path.relpath(resume_path, settings.MEDIA_ROOT)
                 Candidate.objects.create(
                     name=name,
                     resume=rel_path,
-                    score=score,
-                    matched_skills=", ".join(
-                        skill for skill in job_req.get_skills_list() 
-                        if skill in skills
-                    ),
+                    score=round(score),
                     matched=score >= job_req.min_score
                 )
                 
                 matched_candidates.append({
                     'name': name,
                     'resume': os.path.basename(resume_path),
-                    'score': score
+                    'score': score,
+                    'experience': experience,
+                    'matched_skills': matched_skills,
+                    'missing_skills': missing_skills
                 })
                     
             except Exception as e:
                 logger.error(f"Failed to process {resume_path}: {str(e)}")
                 continue
         
-        cache.set(f'matched_{job_req_id}', matched_candidates, timeout=3600)
+        cache.set(f'matched_{user_id}_{job_req_id}', matched_candidates, timeout=3600)
+        match_result = MatchResult.objects.create(
+            user_id=user_id,
+            job_requirement=job_req,
+            position=job_req.position,
+            skills=job_req.skills,
+            min_experience=job_req.min_experience
+        )
+        match_result.save_candidates(
+            sorted(matched_candidates, key=lambda x: x['score'], reverse=True)
+        )
         return {
             'status': 'completed',
             'matched': len(matched_candidates),
+            'match_result_id': match_result.id,
             'total_processed': total_files
         }
         
@@ -113,152 +138,152 @@ from django.core.files.storage import default_storage
 
 logger = logging.getLogger(__name__)
 from .models import EmailConfiguration
-@shared_task(bind=True)
 
-def fetch_resumes_from_email(self, user_id, date_from=None, date_to=None):
-    # Configuration
-    config = EmailConfiguration.objects.get(user_id=user_id)
-    IMAP_SERVER = config.email_host
-    EMAIL = config.email_username
-    PASSWORD = config.email_password
-    PORT = config.email_port
-    USE_TLS = config.use_tls
-    
-    # Import settings and os at the beginning of the function
-    from django.conf import settings
-    import os
-    import logging
-    
-    logger = logging.getLogger(__name__)
-    
-    # Log the base directory and media root for debugging
-    logger.info(f"BASE_DIR: {settings.BASE_DIR}")
-    logger.info(f"MEDIA_ROOT: {settings.MEDIA_ROOT}")
-    
-    # Create a user-specific directory for resumes
-    user_resume_dir = os.path.join(settings.MEDIA_ROOT, 'resumes')
+RESUME_KEYWORDS = ["resume","job","availability" "cv", "application", "apply","intern", "internship", "applying","interview"]
+
 
+def imap_search_query(date_from=None, date_to=None) -> str:
+    """IMAP SEARCH criteria for an optional YYYY-MM-DD date range"""
+    search_criteria = []
     
-    # Log the directory we're trying to create
-    logger.info(f"Attempting to create directory: {user_resume_dir}")
+    # Add date filtering if provided
+    if date_from:
+        try:
+            # Convert date string to IMAP format (DD-Mon-YYYY)
+            from_date = datetime.strptime(date_from, '%Y-%m-%d')
+            formatted_from_date = from_date.strftime('%d-%b-%Y')
+            search_criteria.append(f'SINCE "{formatted_from_date}"')
+            logger.info(f"Filtering emails from: {formatted_from_date}")
+        except ValueError:
+            logger.warning(f"Invalid from_date format: {date_from}")
     
-    try:
-        os.makedirs(user_resume_dir, exist_ok=True)
-        logger.info(f"Directory created successfully: {user_resume_dir}")
-    except Exception as e:
-        logger.error(f"Error creating directory: {str(e)}")
-        # Fallback to a temporary directory
-        import tempfile
-        user_resume_dir = tempfile.mkdtemp()
-        logger.info(f"Using temporary directory instead: {user_resume_dir}")
+    if date_to:
+        try:
+            # Convert date string to IMAP format (DD-Mon-YYYY)
+            # For BEFORE, we need the day AFTER to_date since BEFORE is exclusive
+            to_date = datetime.strptime(date_to, '%Y-%m-%d')
+            # Add one day to make BEFORE inclusive of the to_date
+            to_date_inclusive = to_date + timedelta(days=1)
+            formatted_to_date = to_date_inclusive.strftime('%d-%b-%Y')
+            search_criteria.append(f'BEFORE "{formatted_to_date}"')
+            logger.info(f"Filtering emails to: {date_to} (using BEFORE {formatted_to_date})")
+        except ValueError:
+            logger.warning(f"Invalid to_date format: {date_to}")
     
-    DOWNLOAD_DIR = user_resume_dir
+    # If no date criteria, search all emails
+    if search_criteria:
+        search_query = ' '.join(search_criteria)
+        logger.info(f"Using search query: {search_query}")
+        return search_query
+    return 'ALL'
+
+
+def store_message_attachments(ingest, raw_message: bytes, link: bool = True) -> list:
+    """Store the resume attachments of one RFC822 message. Returns [(document, created), ...]"""
+    IMAP_BYTES_FETCHED.inc(len(raw_message))
+    msg = email.message_from_bytes(raw_message)
+    subject = msg.get("Subject", "")
+    subject_lower = subject.lower()
     
-    RESUME_KEYWORDS = ["resume","job","availability" "cv", "application", "apply","intern", "internship", "applying","interview"]
+    # Check if email subject contains resume keywords
+    if not any(keyword in subject_lower for keyword in RESUME_KEYWORDS):
+        logger.debug(f"Skipping non-resume email: {subject[:50]}...")
+        return []
 
-    saved_files = []
+    logger.info(f"Processing resume email: {subject}")
+    sender_email = email.utils.parseaddr(msg.get("From", ""))[1]
 
-    try:
-        logger.info("Connecting to IMAP...")
-        # Always use a fresh SSL context for each connection
-        ssl_context = ssl.create_default_context()
-        with imaplib.IMAP4_SSL(IMAP_SERVER, 993, ssl_context=ssl_context) as imap:
-            imap.login(EMAIL, PASSWORD)
-            logger.info("Logged in successfully")
+    stored = []
+    for part in msg.walk():
+        if part.get_content_disposition() != 'attachment':
+            continue
 
-            status, _ = imap.select("INBOX")  # IMPORTANT: remove readonly=True
-            if status != 'OK':
-                raise Exception("Failed to select INBOX")
+        filename = part.get_filename()
+        if not filename:
+            continue
 
-            # Build search criteria with date filtering
-            search_criteria = []
-            
-            # Add date filtering if provided
-            if date_from:
-                try:
-                    # Convert date string to IMAP format (DD-Mon-YYYY)
-                    from_date = datetime.strptime(date_from, '%Y-%m-%d')
-                    formatted_from_date = from_date.strftime('%d-%b-%Y')
-                    search_criteria.append(f'SINCE "{formatted_from_date}"')
-                    logger.info(f"Filtering emails from: {formatted_from_date}")
-                except ValueError:
-                    logger.warning(f"Invalid from_date format: {date_from}")
-            
-            if date_to:
-                try:
-                    # Convert date string to IMAP format (DD-Mon-YYYY)
-                    # For BEFORE, we need the day AFTER to_date since BEFORE is exclusive
-                    to_date = datetime.strptime(date_to, '%Y-%m-%d')
-                    # Add one day to make BEFORE inclusive of the to_date
-                    to_date_inclusive = to_date + timedelta(days=1)
-                    formatted_to_date = to_date_inclusive.strftime('%d-%b-%Y')
-                    search_criteria.append(f'BEFORE "{formatted_to_date}"')
-                    logger.info(f"Filtering emails to: {date_to} (using BEFORE {formatted_to_date})")
-                except ValueError:
-                    logger.warning(f"Invalid to_date format: {date_to}")
-            
-            # If no date criteria, search all emails
-            if search_criteria:
-                search_query = ' '.join(search_criteria)
-                logger.info(f"Using search query: {search_query}")
+        filename = decode_header(filename)[0][0]
+        if isinstance(filename, bytes):
+            filename = filename.decode(errors="ignore")
+
+        if not filename.lower().endswith(('.pdf', '.docx')):
+            continue
+
+        payload = part.get_payload(decode=True)
+        if payload:
+            document, created = ingest.store(payload, filename, sender_email, link=link)
+            if created:
+                RESUMES_FETCHED.inc()
+                logger.info(f"Saved resume: {document.path}")
             else:
-                search_query = 'ALL'
-            
-            status, messages = imap.search(None, search_query)
-            if status != 'OK':
-                raise Exception("IMAP search failed")
+                logger.info(f"Attachment {filename} is already stored as {document.filename}")
+            stored.append((document, created))
+        else:
+            logger.warning(f"Attachment {filename} has no payload")
+    return stored
 
-            email_ids = messages[0].split()
-            logger.info(f"Found {len(email_ids)} emails to scan")
 
-            for email_id in email_ids:
-                try:
-                    status, msg_data = imap.fetch(email_id, "(RFC822)")
-                    if status != 'OK':
-                        logger.warning(f"Fetch failed for email {email_id}")
-                        continue
+@timed('imap_fetch')
+def download_resumes(config, folder="INBOX", date_from=None, date_to=None, link=True) -> list:
+    """
+    Download resume attachments from one mailbox folder into the owner's
+    partition of the resume catalog. Returns [(document, created), ...]
+    """
+    # Stores into the sharded layout, skipping attachments already stored
+    # byte-for-byte and (with link=True) linking near-duplicates
+    from hrapp.catalog import ResumeIngest
+    ingest = ResumeIngest(config.user_id)
+    stored = []
 
-                    msg = email.message_from_bytes(msg_data[0][1])
-                    subject = msg.get("Subject", "")
-                    subject_lower = subject.lower()
-                    
-                    # Check if email subject contains resume keywords
-                    if not any(keyword in subject_lower for keyword in RESUME_KEYWORDS):
-                        logger.debug(f"Skipping non-resume email: {subject[:50]}...")
-                        continue
+    logger.info(f"Connecting to IMAP {config.email_host} ({folder})...")
+    # Always use a fresh SSL context for each connection
+    ssl_context = ssl.create_default_context()
+    with imaplib.IMAP4_SSL(config.email_host, 993, ssl_context=ssl_context) as imap:
+        imap.login(config.email_username, config.email_password)
+        logger.info("Logged in successfully")
 
-                    logger.info(f"Processing resume email: {subject}")
+        status, _ = imap.select(folder)  # IMPORTANT: remove readonly=True
+        if status != 'OK':
+            raise Exception(f"Failed to select {folder}")
 
-                    for part in msg.walk():
-                        if part.get_content_disposition() != 'attachment':
-                            continue
+        status, messages = imap.search(None, imap_search_query(date_from, date_to))
+        if status != 'OK':
+            raise Exception("IMAP search failed")
 
-                        filename = part.get_filename()
-                        if not filename:
-                            continue
+        email_ids = messages[0].split()
+        logger.info(f"Found {len(email_ids)} emails to scan")
 
-                        filename = decode_header(filename)[0][0]
-                        if isinstance(filename, bytes):
-                            filename = filename.decode(errors="ignore")
+        for email_id in email_ids:
+            try:
+                status, msg_data = imap.fetch(email_id, "(RFC822)")
+                if status != 'OK':
+                    logger.warning(f"Fetch failed for email {email_id}")
+                    continue
 
-                        if not filename.lower().endswith(('.pdf', '.docx')):
-                            continue
+                stored.extend(store_message_attachments(ingest, msg_data[0][1], link=link))
 
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            filepath = os.path.join(DOWNLOAD_DIR, filename)
-                            with open(filepath, 'wb') as f:
-                                f.write(payload)
+            except Exception as e:
+                logger.error(f"Error processing email {email_id}: {str(e)}")
+                continue
 
-                            saved_files.append(filepath)
-                            logger.info(f"Saved resume: {filepath}")
-                        else:
-                            logger.warning(f"Attachment {filename} has no payload")
+    return stored
 
-                except Exception as e:
-                    logger.error(f"Error processing email {email_id}: {str(e)}")
-                    continue
 
+@shared_task(bind=True)
+def fetch_resumes_from_email(self, user_id, date_from=None, date_to=None):
+    """Fetch one user's INBOX inline and return the stored resume paths"""
+    from hrapp.catalog import absolute_path
+
+    config = EmailConfiguration.objects.get(user_id=user_id)
+    saved_files = []
+
+    try:
+        stored = download_resumes(config, "INBOX", date_from, date_to)
+        for document, created in stored:
+            filepath = absolute_path(document.canonical.path)
+            if filepath not in saved_files:
+                saved_files.append(filepath)
+        schedule_prewarm(user_id, [document.id for document, created in stored if created])
         return saved_files
 
     except Exception as e:
@@ -266,33 +291,331 @@ def fetch_resumes_from_email(self, user_id, date_from=None, date_to=None):
         raise
 
 
+def acquire_imap_slot(host: str, token: str) -> Optional[str]:
+    """
+    Take one of IMAP_MAX_CONNECTIONS_PER_HOST connection slots for a mail
+    server, or None if they are all in use. Slots live in the default
+    cache (Redis), which every worker shares; `token` marks the holder
+    """
+    for slot in range(settings.IMAP_MAX_CONNECTIONS_PER_HOST):
+        key = f"imap_slot:{host.lower()}:{slot}"
+        # Expires on its own if a worker dies while holding it
+        if cache.add(key, token, timeout=settings.IMAP_SLOT_TIMEOUT):
+            return key
+    return None
+
+
+def release_imap_slot(key: str, token: str) -> None:
+    """Free a slot taken with `token`, unless it expired and another task holds it now"""
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+@shared_task(bind=True, name="hrapp.tasks.sync_mailbox", max_retries=60)
+def sync_mailbox(self, user_id, folder="INBOX"):
+    """Sync one mailbox folder; one job of the sync_all_mailboxes fan-out"""
+    summary = {'user_id': user_id, 'folder': folder, 'documents': [], 'error': None}
+
+    config = EmailConfiguration.objects.filter(user_id=user_id).first()
+    if config is None:
+        summary['error'] = 'No email configuration'
+        return summary
+
+    token = self.request.id or uuid.uuid4().hex
+    slot = acquire_imap_slot(config.email_host, token)
+    if slot is None:
+        # Server already has its share of connections: requeue instead of
+        # holding a worker while waiting
+        try:
+            raise self.retry(countdown=settings.IMAP_SLOT_RETRY_SECONDS)
+        except self.MaxRetriesExceededError:
+            summary['error'] = f"No free IMAP slot for {config.email_host}"
+            return summary
+
+    try:
+        stored = download_resumes(config, folder, link=False)
+        summary['documents'] = [document.id for document, created in stored if created]
+    except Exception as e:
+        # Reported to the chord callback instead of failing the whole sync
+        logger.error(f"Mailbox sync failed for user {user_id} ({folder}): {str(e)}")
+        summary['error'] = str(e)
+    finally:
+        release_imap_slot(slot, token)
+
+    return summary
+
+
+@shared_task(bind=True, name="hrapp.tasks.ingest_mailbox_uids", max_retries=60)
+def ingest_mailbox_uids(self, user_id, folder, uids):
+    """Fetch and ingest specific new messages (queued by the IMAP IDLE listener)"""
+    from hrapp.catalog import ResumeIngest
+
+    config = EmailConfiguration.objects.filter(user_id=user_id).first()
+    if config is None:
+        return {'status': 'skipped', 'error': 'No email configuration'}
+
+    token = self.request.id or uuid.uuid4().hex
+    slot = acquire_imap_slot(config.email_host, token)
+    if slot is None:
+        raise self.retry(countdown=settings.IMAP_SLOT_RETRY_SECONDS)
+
+    ingest = ResumeIngest(user_id)
+    stored = []
+    try:
+        ssl_context = ssl.create_default_context()
+        with imaplib.IMAP4_SSL(config.email_host, 993, ssl_context=ssl_context) as imap:
+            imap.login(config.email_username, config.email_password)
+            status, _ = imap.select(folder, readonly=True)
+            if status != 'OK':
+                raise Exception(f"Failed to select {folder}")
+
+            for uid in uids:
+                try:
+                    # BODY.PEEK leaves the message unread for the recruiter
+                    status, msg_data = imap.uid('FETCH', str(uid), '(BODY.PEEK[])')
+                    if status != 'OK' or not msg_data or not isinstance(msg_data[0], tuple):
+                        logger.warning(f"Fetch failed for UID {uid}")
+                        continue
+                    stored.extend(store_message_attachments(ingest, msg_data[0][1], link=False))
+                except Exception as e:
+                    logger.error(f"Error processing UID {uid}: {str(e)}")
+                    continue
+    finally:
+        release_imap_slot(slot, token)
+
+    # Text extraction and linking run on the parse queue, not in the sync worker
+    created_ids = [document.id for document, created in stored if created]
+    if created_ids:
+        ingest_user_resumes.delay(user_id, created_ids)
+    return {
+        'status': 'completed',
+        'user_id': user_id,
+        'messages': len(uids),
+        'new_documents': len(created_ids)
+    }
+
+
+@shared_task(bind=True, name="hrapp.tasks.sync_all_mailboxes")
+def sync_all_mailboxes(self, folders=None):
+    """Fan out one sync job per EmailConfiguration and folder, then ingest the results"""
+    from celery import chord
+
+    folders = folders or settings.IMAP_SYNC_FOLDERS
+    user_ids = list(EmailConfiguration.objects.values_list('user_id', flat=True))
+    jobs = [sync_mailbox.s(user_id, folder) for user_id in user_ids for folder in folders]
+    if not jobs:
+        return {'status': 'skipped', 'mailboxes': 0}
+
+    result = chord(jobs)(ingest_synced_resumes.s())
+    logger.info(f"Started sync of {len(jobs)} mailbox folders (chord {result.id})")
+    return {'status': 'started', 'mailboxes': len(jobs), 'chord_id': result.id}
+
+
+@shared_task(bind=True, name="hrapp.tasks.ingest_synced_resumes")
+def ingest_synced_resumes(self, results):
+    """Chord callback: hand each user's new documents to one ingest job"""
+    from celery import group
+
+    by_user = {}
+    for summary in results:
+        if summary['documents']:
+            by_user.setdefault(summary['user_id'], []).extend(summary['documents'])
+    failed = [summary for summary in results if summary['error']]
+    for summary in failed:
+        logger.warning(f"Sync failed for user {summary['user_id']} ({summary['folder']}): {summary['error']}")
+
+    if by_user:
+        # One job per user: near-duplicate linking uses that user's index,
+        # so users run in parallel but a user's documents are linked in order
+        group(ingest_user_resumes.s(user_id, ids) for user_id, ids in by_user.items()).apply_async()
+
+    return {
+        'mailboxes': len(results),
+        'failed': len(failed),
+        'users': len(by_user),
+        'new_documents': sum(len(ids) for ids in by_user.values())
+    }
+
+
+@shared_task(bind=True, name="hrapp.tasks.ingest_user_resumes")
+def ingest_user_resumes(self, user_id, document_ids):
+    """Extract text for newly synced resumes and link near-duplicates"""
+    from hrapp.catalog import ResumeIngest
+    from hrapp.models import ResumeDocument
+
+    ingest = ResumeIngest(user_id)
+    linked = duplicates = 0
+    canonical = []
+    pending = ResumeDocument.objects.filter(user_id=user_id, id__in=document_ids, simhash__isnull=True)
+    for document in pending.order_by('id'):
+        try:
+            ingest.link(document)
+        except Exception as e:
+            logger.error(f"Ingest failed for {document.path}: {str(e)}")
+            continue
+        linked += 1
+        if document.duplicate_of_id is not None:
+            duplicates += 1
+        else:
+            canonical.append(document.id)
+
+    schedule_prewarm(user_id, canonical)
+    return {'status': 'completed', 'user_id': user_id, 'linked': linked, 'duplicates': duplicates}
+
+
+@shared_task(bind=True, name="hrapp.tasks.prewarm_resumes", ignore_result=True)
+def prewarm_resumes(self, user_id, document_ids, enrich=None):
+    """
+    Warm everything a search reads for newly ingested resumes: cached text,
+    the text store and its skill signatures and the regex profile. With
+    PREWARM_LLM_ENRICHMENT, LLM profiles follow on the llm queue
+    """
+    from hrapp.models import ResumeDocument
+    from hrapp.profiles import get_profile
+    from hrapp.text_cache import get_resume_text
+    from hrapp.text_store import stored_text
+
+    if enrich is None:
+        enrich = settings.PREWARM_LLM_ENRICHMENT
+    warmed = []
+    documents = ResumeDocument.objects.filter(user_id=user_id, id__in=document_ids, duplicate_of__isnull=True)
+    for document in documents.order_by('id'):
+        try:
+            text = get_resume_text(document)
+            if not text:
+                continue
+            stored_text(document, text)
+            get_profile(document, text)
+        except Exception as e:
+            logger.error(f"Prewarm failed for {document.path}: {str(e)}")
+            continue
+        warmed.append(document.id)
+
+    if enrich and warmed:
+        enrich_resume_profiles.apply_async((user_id, warmed), priority=settings.PREWARM_PRIORITY)
+    logger.info(f"Prewarmed {len(warmed)} resumes for user {user_id}")
+    return {'status': 'completed', 'user_id': user_id, 'warmed': len(warmed), 'enrich': bool(enrich and warmed)}
+
+
+@shared_task(bind=True, name="hrapp.tasks.enrich_resume_profiles", ignore_result=True)
+def enrich_resume_profiles(self, user_id, document_ids):
+    """LLM profiles for prewarmed resumes, using the extractor configured for the llm queue"""
+    from hrapp.models import ResumeDocument
+    from hrapp.profiles import enrich_profile
+
+    enriched = 0
+    documents = ResumeDocument.objects.filter(user_id=user_id, id__in=document_ids, duplicate_of__isnull=True)
+    for document in documents.order_by('id'):
+        try:
+            if enrich_profile(document, queue='llm') is not None:
+                enriched += 1
+        except Exception as e:
+            logger.error(f"LLM profile failed for {document.path}: {str(e)}")
+            continue
+
+    return {'status': 'completed', 'user_id': user_id, 'enriched': enriched}
+
+
+def schedule_prewarm(user_id, document_ids):
+    """Queue prewarm_resumes for new documents on the low-priority prewarm queue"""
+    if not document_ids or not settings.PREWARM_ENABLED:
+        return None
+    try:
+        return prewarm_resumes.apply_async(
+            (user_id, list(document_ids)),
+            queue=settings.PREWARM_QUEUE,
+            priority=settings.PREWARM_PRIORITY
+        )
+    except Exception as e:
+        # Best effort: the first search warms whatever this would have
+        logger.warning(f"Could not queue prewarm for user {user_id}: {str(e)}")
+        return None
+
 
 def cleanup_old_files(days: int = 7) -> Dict[str, Union[int, str]]:
-    """Clean up old resume files"""
+    """Clean up old resume files (selected from the catalog, not by stat-ing every file)"""
+    from django.utils import timezone
+    from hrapp.catalog import iter_resumes, absolute_path
+    from hrapp.text_cache import drop_resume_text
+    from hrapp.profiles import drop_profiles
+
     try:
-        cutoff = datetime.now() - timedelta(days=days)
+        cutoff = timezone.now() - timedelta(days=days)
         deleted_count = 0
-        resumes_dir = os.path.join(settings.MEDIA_ROOT, 'resumes')
-        
-        if not os.path.exists(resumes_dir):
-            return {'status': 'skipped', 'message': 'Directory not found'}
         
-        for filename in os.listdir(resumes_dir):
-            filepath = os.path.join(resumes_dir, filename)
+        expired = iter_resumes(extensions=None, include_duplicates=True, older_than=cutoff, all_users=True)
+        for document in list(expired):
+            filepath = absolute_path(document.path)
             try:
-                if os.path.getmtime(filepath) < cutoff.timestamp():
+                if os.path.exists(filepath):
                     os.remove(filepath)
-                    deleted_count += 1
-                    logger.info(f"Deleted old file: {filename}")
+                drop_resume_text(document)
+                drop_profiles(document)
+                document.delete()
+                deleted_count += 1
+                logger.info(f"Deleted old file: {document.filename}")
             except Exception as e:
-                logger.error(f"Couldn't delete {filename}: {str(e)}")
+                logger.error(f"Couldn't delete {document.filename}: {str(e)}")
                 continue
         
+        purged = purge_match_results(days)
         return {
             'status': 'completed',
             'deleted': deleted_count,
+            'match_results_deleted': purged['deleted'],
             'retention_days': days
         }
     except Exception as e:
         logger.error(f"Cleanup failed: {str(e)}")
         return {'status': 'failed', 'error': str(e)}
+
+
+@shared_task(name="hrapp.tasks.purge_match_results", ignore_result=True)
+def purge_match_results(days=None):
+    """Delete stored searches (and their candidate rows) older than MATCH_RESULT_RETENTION_DAYS"""
+    from django.utils import timezone
+    from hrapp.models import MatchResult
+
+    days = days or settings.MATCH_RESULT_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    # Rows from before searches required a login have no owner and are never exportable
+    expired = MatchResult.objects.filter(created_at__lt=cutoff) | MatchResult.objects.filter(user__isnull=True)
+    deleted, _ = expired.delete()
+    logger.info(f"Deleted {deleted} stored match result rows older than {days} days")
+    return {'status': 'completed', 'deleted': deleted, 'retention_days': days}
+
+
+@shared_task(bind=True, name="hrapp.tasks.generate_pdf_report")
+def generate_pdf_report(self, candidates=None, job_id=None, result_id=None, filename="matching_candidates",
+                        user_id=None):
+    """Render a large PDF report off the request path and return its download URL"""
+    from hrapp.export_utils import build_pdf_report, get_export_dir, iter_job_candidates
+    from hrapp.models import MatchResult
+
+    if user_id is None:
+        raise PermissionError("PDF reports are generated for a logged-in user only")
+    if result_id is not None:
+        match_result = MatchResult.objects.get(id=result_id)
+        if match_result.user_id != user_id:
+            raise PermissionError(f"Match result {result_id} belongs to another user")
+        candidates = list(match_result.iter_candidates())
+    elif candidates is None:
+        candidates = list(iter_job_candidates(job_id, user_id))
+
+    report_name = f"{filename}_{datetime.now().date()}_{self.request.id}.pdf"
+    report_path = os.path.join(get_export_dir(user_id), report_name)
+    try:
+        build_pdf_report(candidates, report_path)
+    except Exception as e:
+        logger.error(f"PDF report generation failed: {str(e)}")
+        if os.path.exists(report_path):
+            os.remove(report_path)
+        raise
+
+    logger.info(f"Generated PDF report {report_path} ({len(candidates)} candidates)")
+    return {
+        'status': 'completed',
+        'filename': report_name,
+        'user_id': user_id,
+        'rows': len(candidates)
+    }
@@ -0,0 +1,142 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from hrapp.compaction import CHARS_PER_TOKEN, compact_resume
+from hrapp.imap_idle import Mailbox, MailboxWatcher
+
+
+class FakeImapServer:
+    """
+    Local IMAP stand-in: answers LOGIN, EXAMINE, UID SEARCH and IDLE for one
+    folder. The first IDLE delivers `arriving` with an EXISTS; the next one
+    closes the connection, which ends MailboxWatcher.watch_once
+    """
+
+    def __init__(self, uids, arriving=(), uidvalidity=7):
+        self.uids = list(uids)
+        self.arriving = list(arriving)
+        self.uidvalidity = uidvalidity
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        def send(line):
+            writer.write(line.encode() + b'\r\n')
+
+        send('* OK fake IMAP ready')
+        idle_tag = None
+        while line := (await reader.readline()).decode().rstrip('\r\n'):
+            if idle_tag and line == 'DONE':
+                send(f'{idle_tag} OK IDLE terminated')
+                idle_tag = None
+                continue
+            tag, command = line.split(' ', 1)
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EXAMINE':
+                send(f'* {len(self.uids)} EXISTS')
+                send(f'* OK [UIDVALIDITY {self.uidvalidity}]')
+                send(f'* OK [UIDNEXT {max(self.uids, default=0) + 1}]')
+            elif verb == 'UID':
+                first = int(command.rsplit(' ', 1)[1].split(':')[0])
+                # "n:*" always matches the newest message, as on a real server
+                found = [uid for uid in self.uids if uid >= first] or self.uids[-1:]
+                send('* SEARCH ' + ' '.join(map(str, found)))
+            elif verb == 'IDLE':
+                if not self.arriving:
+                    break
+                send('+ idling')
+                self.uids.extend(self.arriving)
+                self.arriving = []
+                send(f'* {len(self.uids)} EXISTS')
+                idle_tag = tag
+                await writer.drain()
+                continue
+            elif verb == 'LOGOUT':
+                send('* BYE')
+            send(f'{tag} OK {verb} completed')
+            await writer.drain()
+        writer.close()
+
+
+class MemoryUidStore:
+    def __init__(self, **cursors):
+        self.cursors = dict(cursors)
+
+    async def get(self, mailbox, uidvalidity):
+        return self.cursors.get(f'{mailbox.folder}_{uidvalidity}')
+
+    async def set(self, mailbox, uidvalidity, uid):
+        self.cursors[f'{mailbox.folder}_{uidvalidity}'] = uid
+
+
+class MailboxWatcherTests(SimpleTestCase):
+    def watch(self, server, uid_store):
+        queued = []
+
+        async def enqueue(user_id, folder, uids):
+            queued.append(uids)
+
+        async def run():
+            port = await server.start()
+            mailbox = Mailbox(user_id=1, host='127.0.0.1', username='hr', password='secret', port=port)
+            watcher = MailboxWatcher(mailbox, enqueue, uid_store=uid_store, idle_timeout=5)
+            try:
+                with self.assertRaises(ConnectionError):
+                    await asyncio.wait_for(watcher.watch_once(), 10)
+            finally:
+                await server.stop()
+
+        asyncio.run(run())
+        return queued
+
+    def test_first_start_only_queues_new_mail(self):
+        store = MemoryUidStore()
+        queued = self.watch(FakeImapServer(uids=[1, 2, 3], arriving=[4]), store)
+        self.assertEqual(queued, [[4]])
+        self.assertEqual(store.cursors, {'INBOX_7': 4})
+
+    def test_restart_catches_up_from_stored_uid(self):
+        store = MemoryUidStore(INBOX_7=3)
+        queued = self.watch(FakeImapServer(uids=[1, 2, 3, 4, 5], arriving=[6]), store)
+        self.assertEqual(queued, [[4, 5], [6]])
+        self.assertEqual(store.cursors, {'INBOX_7': 6})
+
+    def test_new_uidvalidity_starts_over(self):
+        store = MemoryUidStore(INBOX_7=3)
+        queued = self.watch(FakeImapServer(uids=[1, 2], arriving=[3], uidvalidity=8), store)
+        self.assertEqual(queued, [[3]])
+        self.assertEqual(store.cursors, {'INBOX_7': 3, 'INBOX_8': 3})
+
+
+class CompactResumeTests(SimpleTestCase):
+    def test_single_long_line_is_truncated_to_budget(self):
+        text = 'python developer with django experience ' * 250
+        compacted = compact_resume(text, token_budget=200)
+        self.assertTrue(compacted)
+        self.assertLessEqual(len(compacted), 200 * CHARS_PER_TOKEN)
+        self.assertTrue(text.startswith(compacted))
+
+    def test_sections_in_priority_order_within_budget(self):
+        text = (
+            'Jane Doe\njane@example.com\n'
+            'Hobbies\nChess\n'
+            'Education\nBSc Computer Science\n'
+            'Skills\nPython, Django\n'
+        )
+        self.assertEqual(
+            compact_resume(text, token_budget=100),
+            'Jane Doe\njane@example.com\n\nSkills:\nPython, Django\n\nEducation:\nBSc Computer Science'
+        )
+
+    def test_line_past_remaining_budget_is_truncated(self):
+        text = 'Jane Doe\nSkills\nPython\n' + 'x' * 40 + '\n' + 'y' * 40
+        compacted = compact_resume(text, token_budget=15)
+        self.assertTrue(compacted.endswith('x' * 40 + '\nyy'))
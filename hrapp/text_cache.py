@@ -0,0 +1,68 @@
+# hrapp/text_cache.py
+"""
+Per-user cache of extracted resume text.
+
+Text is stored once per document, keyed by content hash, under
+
+    RESUME_TEXT_CACHE_DIR/user_<id>/<sha[0:2]>/<sha>.txt
+
+so a repeated search reads plain text instead of re-parsing every PDF or
+DOCX, and each recruiter's cache only holds their own resumes.
+"""
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def partition_dir(user_id) -> str:
+    root = getattr(settings, 'RESUME_TEXT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'text_cache'))
+    return os.path.join(root, f'user_{user_id}' if user_id else 'shared')
+
+
+def cache_path(document) -> str:
+    return os.path.join(partition_dir(document.user_id), document.sha256[:2], f"{document.sha256}.txt")
+
+
+def get_resume_text(document, filepath=None) -> str:
+    """Cached text for a catalogued resume, extracting (and caching) it on a miss"""
+    from .catalog import absolute_path
+    from .metrics import record_cache
+    from .utils import extract_text_from_resume
+
+    path = cache_path(document)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        record_cache('resume_text', True)
+        return text
+    except FileNotFoundError:
+        record_cache('resume_text', False)
+
+    text = extract_text_from_resume(filepath or absolute_path(document.path))
+    if text:
+        _write(path, text)
+    return text
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so a concurrent reader never sees half a file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache resume text at {path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def drop_resume_text(document) -> None:
+    path = cache_path(document)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,304 @@
+# hrapp/text_store.py
+"""
+Append-only, memory-mapped store of lowercased resume text.
+
+Each user partition is three files under RESUME_TEXT_STORE_DIR/user_<id>/:
+
+    texts.bin        lowercased UTF-8 blobs, appended back to back
+    texts.idx        fixed-size records (sha256, offset, length), one per blob
+    signatures.bin   one trigram bloom signature per index record, in the
+                     same order (hrapp.prefilter)
+
+Readers map texts.bin read-only and score resumes on StoredText views into
+the mapping: substring checks go through mmap.find and regexes run with
+pos/endpos over the mapped buffer, so scanning a corpus decodes nothing
+and makes no lowercased copies, and every worker process shares the same
+page cache. Original-case text (needed for names, emails, the LLM) stays
+in hrapp.text_cache.
+
+Bytes regexes only know ASCII whitespace and digits, so blobs are stored in
+`store_form`: lowercased, with Unicode whitespace (NBSP and the like,
+common in PDF text) as a plain space and Unicode digits as ASCII ones.
+A bytes pattern then matches what the str pattern matches on the text.
+"""
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .metrics import RESUMES_PREFILTERED, timed
+from .prefilter import SIGNATURE_BYTES, SkillPrefilter, trigram_signature
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+INDEX_RECORD = struct.Struct('<32sQI')  # sha256 digest, offset, length
+
+DATA_FILE = 'texts.bin'
+INDEX_FILE = 'texts.idx'
+SIGNATURE_FILE = 'signatures.bin'
+
+_UNICODE_SPACES = [ch for ch in map(chr, range(0x80, 0x3001)) if ch.isspace()]
+_UNICODE_DIGITS = [ch for ch in map(chr, range(0x80, 0x20000)) if ch.isdecimal()]
+STORE_FORM_TABLE = {
+    **{ord(ch): ' ' for ch in _UNICODE_SPACES},
+    **{ord(ch): str(unicodedata.decimal(ch)) for ch in _UNICODE_DIGITS},
+}
+# Characters store_form rewrites, as UTF-8: only blobs stored before it existed contain them
+UNNORMALIZED_BYTES_RE = re.compile(
+    b'|'.join(re.escape(ch.encode('utf-8')) for ch in _UNICODE_SPACES + _UNICODE_DIGITS)
+)
+
+
+def store_form(text: str) -> str:
+    """Text as it is kept in the store (see module docstring)"""
+    return text.lower().translate(STORE_FORM_TABLE)
+
+
+def partition_dir(user_id) -> str:
+    root = getattr(settings, 'RESUME_TEXT_STORE_DIR', os.path.join(settings.BASE_DIR, 'text_store'))
+    return os.path.join(root, f'user_{user_id}' if user_id else 'shared')
+
+
+@contextmanager
+def _exclusive(f):
+    """Exclusive lock on an open file, held by one writer process at a time"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class StoredText:
+    """Zero-copy view of one resume's lowercased text inside the mapped store"""
+    __slots__ = ('buffer', 'start', 'end')
+
+    def __init__(self, buffer, start: int, end: int):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __contains__(self, term) -> bool:
+        """Substring test; pass bytes (already lowercased) to avoid encoding per call"""
+        if isinstance(term, str):
+            term = store_form(term).encode('utf-8')
+        return self.buffer.find(term, self.start, self.end) != -1
+
+    def search(self, pattern: 're.Pattern[bytes]'):
+        return pattern.search(self.buffer, self.start, self.end)
+
+    def finditer(self, pattern: 're.Pattern[bytes]'):
+        return pattern.finditer(self.buffer, self.start, self.end)
+
+    def memoryview(self) -> memoryview:
+        return memoryview(self.buffer)[self.start:self.end]
+
+    def decode(self) -> str:
+        return str(self.memoryview(), 'utf-8', errors='replace')
+
+
+class TextStore:
+    """One user's text store; safe to share between threads of a process"""
+
+    def __init__(self, user_id=None):
+        self.directory = partition_dir(user_id)
+        self.data_path = os.path.join(self.directory, DATA_FILE)
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        self.signature_path = os.path.join(self.directory, SIGNATURE_FILE)
+        # digest -> (offset, length, slot); slot is the record number, which
+        # also places the document's signature
+        self._index: Dict[bytes, Tuple[int, int, int]] = {}
+        self._index_size = 0
+        self._data_end = 0
+        self._mm: Optional[mmap.mmap] = None
+        self._signatures: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def _refresh(self) -> None:
+        """Pick up records appended since the last look (by any process) and remap if needed"""
+        try:
+            size = os.path.getsize(self.index_path)
+        except OSError:
+            return
+        # A torn trailing record is ignored until its writer finishes it
+        size -= size % INDEX_RECORD.size
+        if size > self._index_size:
+            with open(self.index_path, 'rb') as f:
+                f.seek(self._index_size)
+                chunk = f.read(size - self._index_size)
+            slot = self._index_size // INDEX_RECORD.size
+            for digest, offset, length in INDEX_RECORD.iter_unpack(chunk):
+                self._index.setdefault(digest, (offset, length, slot))
+                self._data_end = max(self._data_end, offset + length)
+                slot += 1
+            self._index_size = size
+
+        if self._data_end and (self._mm is None or len(self._mm) < self._data_end):
+            with open(self.data_path, 'rb') as f:
+                remapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Views handed out earlier keep the old mapping alive until they go
+            self._mm = remapped
+
+        signatures_end = (self._index_size // INDEX_RECORD.size) * SIGNATURE_BYTES
+        if (signatures_end and (self._signatures is None or len(self._signatures) < signatures_end)
+                and os.path.exists(self.signature_path)):
+            with open(self.signature_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    self._signatures = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, sha256: str) -> Optional[StoredText]:
+        """Lowercased text of a document, or None if it hasn't been stored"""
+        digest = bytes.fromhex(sha256)
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry is None:
+                self._refresh()
+                entry = self._index.get(digest)
+            if entry is None:
+                return None
+            offset, length, _ = entry
+            return StoredText(self._mm, offset, offset + length)
+
+    def may_match(self, sha256: str, prefilter: SkillPrefilter) -> bool:
+        """
+        False only if the document is stored and its signature rules out every
+        skill of the prefilter; unknown documents are kept for full scoring
+        """
+        if not prefilter.active:
+            return True
+        digest = bytes.fromhex(sha256)
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry is None:
+                self._refresh()
+                entry = self._index.get(digest)
+            signatures = self._signatures
+        if entry is None or signatures is None:
+            return True
+        offset = entry[2] * SIGNATURE_BYTES
+        if offset + SIGNATURE_BYTES > len(signatures):
+            return True
+        return prefilter.may_match(signatures, offset)
+
+    def append(self, sha256: str, text: str) -> None:
+        """Store a document's text once; later calls for the same hash are no-ops"""
+        digest = bytes.fromhex(sha256)
+        blob = store_form(text).encode('utf-8')
+        signature = trigram_signature(blob)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self.index_path, 'ab+') as index_file, _exclusive(index_file):
+            self._refresh()
+            if digest in self._index:
+                return
+            with open(self.data_path, 'ab') as data_file:
+                data_file.seek(0, os.SEEK_END)
+                offset = data_file.tell()
+                data_file.write(blob)
+                data_file.flush()
+                os.fsync(data_file.fileno())
+            # A torn record can only be left by a writer that died holding the lock
+            slot = self._index_size // INDEX_RECORD.size
+            index_file.truncate(self._index_size)
+            # Written at the slot's position rather than appended, so a record
+            # left over by a writer that died before its index record is overwritten
+            fd = os.open(self.signature_path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0))
+            try:
+                filled = os.fstat(fd).st_size // SIGNATURE_BYTES
+                if filled < slot:
+                    self._backfill_signatures(fd, filled, slot)
+                os.lseek(fd, slot * SIGNATURE_BYTES, os.SEEK_SET)
+                os.write(fd, signature)
+            finally:
+                os.close(fd)
+            # The index record goes last, so readers never see a blob before it is complete
+            index_file.seek(0, os.SEEK_END)
+            index_file.write(INDEX_RECORD.pack(digest, offset, len(blob)))
+            index_file.flush()
+        logger.debug(f"Stored {len(blob)} bytes of text for {sha256[:12]} in {self.directory}")
+
+    def _backfill_signatures(self, fd: int, first: int, last: int) -> None:
+        """Signatures for records stored before this partition had a signatures file"""
+        by_slot = {slot: (offset, length) for offset, length, slot in self._index.values()}
+        os.lseek(fd, first * SIGNATURE_BYTES, os.SEEK_SET)
+        for slot in range(first, last):
+            offset, length = by_slot.get(slot, (0, 0))
+            os.write(fd, trigram_signature(self._mm[offset:offset + length]) if length else bytes(SIGNATURE_BYTES))
+        logger.info(f"Backfilled {last - first} text signatures in {self.directory}")
+
+
+_stores: Dict[object, TextStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_text_store(user_id=None) -> TextStore:
+    """Process-wide TextStore for a user's partition"""
+    with _stores_lock:
+        store = _stores.get(user_id)
+        if store is None:
+            store = _stores[user_id] = TextStore(user_id)
+        return store
+
+
+@timed('prefilter')
+def prefilter_documents(documents: Iterable, terms: Iterable[str]) -> List:
+    """
+    Documents that might contain at least one of `terms`, judged from their
+    signatures alone (no text is read). Documents not in the store are kept
+    """
+    prefilter = SkillPrefilter(terms)
+    documents = list(documents)
+    if not prefilter.active:
+        return documents
+    kept = [
+        document for document in documents
+        if get_text_store(document.user_id).may_match(document.sha256, prefilter)
+    ]
+    RESUMES_PREFILTERED.inc(len(kept), result='kept')
+    RESUMES_PREFILTERED.inc(len(documents) - len(kept), result='dropped')
+    return kept
+
+
+def stored_text(document, text: Optional[str] = None) -> Optional[StoredText]:
+    """
+    Mapped lowercased text for a catalogued document. When it isn't in the
+    store yet, `text` (or the text cache) is appended first
+    """
+    store = get_text_store(document.user_id)
+    view = store.get(document.sha256)
+    if view is None:
+        if text is None:
+            from .text_cache import get_resume_text
+            text = get_resume_text(document)
+        if not text:
+            return None
+        store.append(document.sha256, text)
+        view = store.get(document.sha256)
+    return view
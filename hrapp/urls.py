@@ -18,9 +18,13 @@ urlpatterns = [
     path('match-resumes/', views.match_resumes, name='match_resumes'), 
     path('resume/<str:filename>/', views.view_resume, name='view_resume'),
     path('export/<str:format_type>/', views.export_results, name='export_results'),  
+    path('export/<str:format_type>/<int:result_id>/', views.export_match_result, name='export_match_result'),
+    path('export-status/<str:task_id>/', views.export_status, name='export_status'),
+    path('exports/<str:filename>/', views.download_export, name='download_export'),
     path('test-email-connection/', views.test_email_connection, name='test_email_connection'),  
     
     
+    path('metrics', views.metrics_view, name='metrics'),
     path('', views.root_redirect, name='root_redirect'),
 
 ]
\ No newline at end of file
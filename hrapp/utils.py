@@ -5,12 +5,12 @@ import time
 import json
 import warnings
 from typing import List, Dict, Any, Union
-from PyPDF2 import PdfReader
-from docx import Document
-import pdfplumber
-import google.generativeai as genai
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from tenacity import retry, stop_after_attempt, wait_exponential
+from .metrics import timed
+from .log_utils import hot_log
+from .extraction import get_text_extractor
 import imaplib  # For IMAP connection testing
 import smtplib  # For SMTP connection testing
 import logging  # For error logging
@@ -23,72 +23,66 @@ from imaplib import IMAP4_SSL, IMAP4
 from smtplib import SMTP, SMTP_SSL, SMTPException
 
 
+# Level and handlers come from settings.LOGGING; hot loops log through hot_log
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set to INFO in production
-
-# Create console handler
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)  # Set to INFO in production
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-ch.setFormatter(formatter)
-logger.addHandler(ch)
 
-# Configure Gemini API
+# Gemini is configured on first use, not at import, so manage.py commands,
+# workers and tests start fast and work without a key until an LLM call is made
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    raise ValueError("Missing GEMINI_API_KEY in environment variables")
-
-genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel(
-    'gemini-1.5-pro',
-    generation_config={
-        'temperature': 0.1,
-        'max_output_tokens': 500,
-        'top_p': 0.3
-    },
-    safety_settings={
-        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE'
-    }
-)
+_genai = None
+_gemini_model = None
+
+
+def get_genai():
+    """Import and configure google.generativeai on first use"""
+    global _genai
+    if _genai is None:
+        api_key = os.getenv('GEMINI_API_KEY') or GEMINI_API_KEY
+        if not api_key:
+            raise ImproperlyConfigured("Missing GEMINI_API_KEY in environment variables")
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        _genai = genai
+    return _genai
+
+
+def get_gemini_model():
+    """Shared, lazily created Gemini model"""
+    global _gemini_model
+    if _gemini_model is None:
+        _gemini_model = get_genai().GenerativeModel(
+            getattr(settings, 'GEMINI_MODEL', 'gemini-1.5-pro'),
+            generation_config={
+                'temperature': 0.1,
+                'max_output_tokens': 500,
+                'top_p': 0.3
+            },
+            safety_settings={
+                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE'
+            }
+        )
+    return _gemini_model
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
 def extract_with_gemini(prompt: str) -> str:
     """Protected API call with rate limiting"""
     try:
-        response = gemini_model.generate_content(prompt)
+        response = get_gemini_model().generate_content(prompt)
         return response.text if response.text else ""
     except Exception as e:
         if "quota" in str(e).lower():
             time.sleep(5)  # Additional delay for quota issues
         raise
 
+@timed('extract_text')
 def extract_text_from_resume(filepath: str) -> str:
-    """Robust text extraction with multiple fallbacks"""
+    """Robust text extraction with multiple fallbacks (see hrapp.extraction)"""
     try:
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"File not found: {filepath}")
         
-        ext = os.path.splitext(filepath)[1].lower()
-        
-        if ext == '.txt':
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
-                
-        elif ext == '.pdf':
-            # Try pdfplumber first
-            try:
-                with pdfplumber.open(filepath) as pdf:
-                    return "\n".join(page.extract_text() or "" for page in pdf.pages)
-            except Exception:
-                with open(filepath, 'rb') as f:
-                    return " ".join(page.extract_text() or "" for page in PdfReader(f).pages)
-                    
-        elif ext == '.docx':
-            return " ".join(p.text for p in Document(filepath).paragraphs if p.text)
-            
-        else:
-            raise ValueError(f"Unsupported file type: {filepath}")
+        return get_text_extractor(filepath)(filepath)
             
     except Exception as e:
         warnings.warn(f"Error extracting text: {str(e)}")
@@ -108,47 +102,49 @@ def extract_skills_from_resume(file_path: str, skills_to_find: List[str]) -> Lis
         List of matched skills
     """
     try:
-        # Log the input parameters
-        logger.info(f"Extracting skills from {file_path}")
-        logger.info(f"Skills to find: {skills_to_find}")
-        
         text = extract_text_from_resume(file_path)
         if not text:
-            logger.warning(f"No text extracted from {file_path}")
+            logger.warning("No text extracted from %s", file_path)
             return []
             
-        # Normalize cases for comparison
-        text_lower = text.lower()
-        skills_lower = [s.lower() for s in skills_to_find]
-        
-        # Log the first 100 characters of the text
-        logger.info(f"Text from resume (first 100 chars): {text_lower[:100]}...")
-        
-        # Find exact matches
-        matched_skills = []
-        for i, skill in enumerate(skills_lower):
-            if skill in text_lower:
-                matched_skills.append(skills_to_find[i])
-                logger.info(f"Found skill: {skills_to_find[i]}")
-        
-        # If no exact matches, try partial matches
-        if not matched_skills:
-            logger.info("No exact matches found, trying partial matches")
-            for i, skill in enumerate(skills_lower):
-                # Check if any word in the skill is in the text
-                skill_words = skill.split()
-                for word in skill_words:
-                    if len(word) > 3 and word in text_lower:  # Only match words longer than 3 chars
-                        matched_skills.append(skills_to_find[i])
-                        logger.info(f"Found partial match for skill: {skills_to_find[i]} (matched word: {word})")
-                        break
-        
-        logger.info(f"Matched skills: {matched_skills}")
+        matched_skills, match_type = match_skills(text.lower(), skills_to_find)
+        hot_log(logger, 'skills_extracted', file=file_path, match_type=match_type,
+                searched=skills_to_find, matched=matched_skills)
         return matched_skills
         
     except Exception as e:
-        logger.error(f"Error extracting skills from {file_path}: {str(e)}")
+        logger.error("Error extracting skills from %s: %s", file_path, e)
         return []
+
+
+def match_skills(text_lower, skills_to_find: List[str]) -> Tuple[List[str], str]:
+    """
+    Skills found in already lowercased text: exact matches, or if there are
+    none, skills with a word longer than 3 characters in the text. The text
+    can be a str or a hrapp.text_store.StoredText, which is searched in place
+
+    Returns:
+        (matched skills, 'exact' or 'partial')
+    """
+    skills_lower = [s.lower() for s in skills_to_find]
+
+    # Find exact matches
+    matched_skills = [
+        skills_to_find[i]
+        for i, skill in enumerate(skills_lower)
+        if skill in text_lower
+    ]
+    if matched_skills:
+        return matched_skills, 'exact'
+
+    # If no exact matches, try partial matches
+    for i, skill in enumerate(skills_lower):
+        # Check if any word in the skill is in the text
+        for word in skill.split():
+            if len(word) > 3 and word in text_lower:  # Only match words longer than 3 chars
+                matched_skills.append(skills_to_find[i])
+                break
+    return matched_skills, 'partial'
     
     
 def extract_experience(text: str) -> float:
@@ -179,18 +175,9 @@ def get_resume_files(user_id=None) -> List[str]:
     if not os.path.exists(resumes_dir):
         os.makedirs(resumes_dir, exist_ok=True)
     
-    # If user_id is provided, use user-specific directory
-    if user_id:
-        user_dir = os.path.join(resumes_dir, f'user_{user_id}')
-        if os.path.exists(user_dir):
-            resumes_dir = user_dir
-    
-    # Get all resume files
-    resume_files = []
-    if os.path.exists(resumes_dir):
-        for filename in os.listdir(resumes_dir):
-            if filename.lower().endswith(('.pdf', '.docx')):
-                resume_files.append(os.path.join(resumes_dir, filename))
+    # Get all resume files from the catalog (no directory scan)
+    from .catalog import iter_resumes, absolute_path
+    resume_files = [absolute_path(document.path) for document in iter_resumes(user_id)]
     
     # If no resume files found, create a sample resume for testing
     if not resume_files:
@@ -248,13 +235,6 @@ def calculate_match_score(
         - matched_skills: List[str] (specific matched skills)
         - missing_skills: List[str] (required but not found)
     """
-    # Log input parameters
-    logger.info(f"Calculating match score")
-    logger.info(f"Resume skills: {resume_skills}")
-    logger.info(f"Job skills: {job_skills}")
-    logger.info(f"Min experience: {min_experience}")
-    logger.info(f"Resume experience: {resume_experience}")
-    
     # Normalize skill cases for comparison
     resume_skills_lower = [s.lower() for s in resume_skills]
     job_skills_lower = [s.lower() for s in job_skills]
@@ -292,12 +272,10 @@ def calculate_match_score(
     # Combine scores
     total_score = max(0.0, min(100.0, round(skill_match + exp_match, 1)))
     
-    # Log results
-    logger.info(f"Matched skills: {matched_skills}")
-    logger.info(f"Missing skills: {missing_skills}")
-    logger.info(f"Skill match score: {skill_match}")
-    logger.info(f"Experience match score: {exp_match}")
-    logger.info(f"Total score: {total_score}")
+    hot_log(logger, 'match_score', resume_skills=resume_skills, job_skills=job_skills,
+            min_experience=min_experience, resume_experience=resume_experience,
+            matched=matched_skills, missing=missing_skills, skill_match=skill_match,
+            exp_match=exp_match, total=total_score)
     
     # For testing, return at least 1 point if there's any match at all
     if len(matched_skills) > 0 and total_score == 0:
@@ -307,7 +285,6 @@ def calculate_match_score(
 
 import re
 from typing import Dict, Any, List, Optional
-import dateparser
 from datetime import datetime
 
 def extract_candidate_info(text: str) -> Dict[str, Any]:
@@ -323,15 +300,12 @@ def extract_candidate_info(text: str) -> Dict[str, Any]:
             'skills': List[str],
             'education': List[str]
         }
+
+    Single text pass with precompiled patterns; same output as calling
+    the individual extract_* helpers below.
     """
-    return {
-        'name': extract_name_from_resume(text),
-        'email': extract_email_from_resume(text),
-        'phone': extract_phone(text),
-        'experience': calculate_total_experience(text),
-        'skills': extract_skills_section(text),
-        'education': extract_education(text)
-    }
+    from .candidate_info import extract_candidate_fields
+    return extract_candidate_fields(text)
 
 def extract_name_from_resume(text: str) -> str:
     """Extract candidate name using multi-method approach"""
@@ -387,28 +361,9 @@ def calculate_total_experience(text: str) -> float:
             except (ValueError, IndexError):
                 continue
     
-    # Fallback: Parse work history dates
-    date_ranges = re.findall(
-        r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s*\d{4}.*?'
-        r'(?:to|–|-|present|now|current|\d{4})', 
-        text, 
-        re.IGNORECASE
-    )
-    
-    total_days = 0
-    for date_range in date_ranges[:3]:  # Check first 3 positions
-        dates = re.findall(
-            r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s*\d{4}',
-            date_range, 
-            re.IGNORECASE
-        )
-        if len(dates) >= 2:
-            start = dateparser.parse(dates[0])
-            end = dateparser.parse(dates[1]) if not re.search(r'(present|now|current)', date_range, re.I) else datetime.now()
-            if start and end:
-                total_days += (end - start).days
-    
-    return round(total_days / 365, 1)  # Convert to years
+    # Fallback: Parse work history dates (union of all employment periods)
+    from .work_history import total_experience_years
+    return total_experience_years(text)
 
 def extract_skills_section(text: str) -> List[str]:
     """Extract skills from dedicated skills section"""
@@ -440,7 +395,8 @@ def extract_education(text: str) -> List[str]:
 def process_resume_match(position: str, 
                        searched_skills: List[str], 
                        min_experience: int, 
-                       priority: str = 'medium') -> List[Dict[str, Any]]:
+                       priority: str = 'medium',
+                       user_id=None) -> list:
     
     """
     Process all resumes and return matches sorted by score
@@ -450,44 +406,41 @@ def process_resume_match(position: str,
         searched_skills: List of required skills
         min_experience: Minimum years required
         priority: 'high'/'medium'/'low' (affects scoring)
+        user_id: Owner of the resumes to search (only their partition is read)
     
     Returns:
-        List of candidate dicts sorted by match score
+        List of CandidateResult rows sorted by match score
     """
+    from .catalog import iter_resumes, absolute_path, resume_url
+    from .text_cache import get_resume_text
+    from .text_store import prefilter_documents, stored_text
+    from .results import CandidateResult, SkillVocabulary
+
     results = []
-    resumes_dir = os.path.join(settings.MEDIA_ROOT, 'resumes')
-    
-    # Debug logging
-    logger.info(f"Searching for resumes in: {resumes_dir}")
-    logger.info(f"Directory exists: {os.path.exists(resumes_dir)}")
-    
-    if not os.path.exists(resumes_dir):
-        logger.warning(f"Resumes directory not found: {resumes_dir}")
-        return results
-    
-    # List all files in directory
-    all_files = os.listdir(resumes_dir)
-    logger.info(f"Files in directory: {all_files}")
+    vocabulary = SkillVocabulary(searched_skills)
     
-    for filename in all_files:
-        if not filename.lower().endswith(('.pdf', '.docx', '.txt')):
-            logger.info(f"Skipping non-resume file: {filename}")
-            continue
-            
+    # Resumes come from the user's catalog partition, one canonical file per duplicate group.
+    # match_skills also accepts a skill's longer words, so those count for the prefilter too
+    terms = list(searched_skills) + [
+        word for skill in searched_skills for word in skill.split() if len(word) > 3
+    ]
+    documents = prefilter_documents(iter_resumes(user_id, extensions=('.pdf', '.docx', '.txt')), terms)
+    for document in documents:
+        filename = document.filename
         try:
-            filepath = os.path.join(resumes_dir, filename)
-            logger.info(f"Processing resume: {filepath}")
+            filepath = absolute_path(document.path)
             
-            text = extract_text_from_resume(filepath)
+            text = get_resume_text(document, filepath)
             
             if not text:
-                logger.warning(f"Could not extract text from {filename}")
+                logger.warning("Could not extract text from %s", filename)
                 continue
                 
-            # Extract candidate information
+            # Skills are matched on the mapped lowercased text, not a fresh extraction
+            stored = stored_text(document, text)
             candidate_info = {
                 'name': extract_name_from_resume(text) or os.path.splitext(filename)[0],
-                'skills': extract_skills_from_resume(filepath, searched_skills),
+                'skills': match_skills(stored if stored is not None else text.lower(), searched_skills)[0],
                 'experience': extract_experience(text)
             }
             
@@ -510,26 +463,23 @@ def process_resume_match(position: str,
                 
             # Only include candidates with matched skills
             if matched_skills:
-                logger.info(f"Adding {filename} to results with score {score}")
-                results.append({
-                    'name': candidate_info.get('name', filename),
-                    'score': round(score, 1),
-                    'matched_skills': matched_skills,
-                    'missing_skills': missing_skills,
-                    'experience': candidate_info.get('experience', 0),
-                    'filename': filename,
-                    'resume_url': f'/media/resumes/{filename}'
-                })
-            else:
-                logger.info(f"Skipping {filename} - no matched skills")
+                hot_log(logger, 'resume_matched', filename=filename, score=score)
+                results.append(CandidateResult(
+                    name=candidate_info.get('name', filename),
+                    score=round(score, 1),
+                    matched_skills=vocabulary.as_tuple(matched_skills),
+                    missing_skills=vocabulary.as_tuple(missing_skills),
+                    experience=candidate_info.get('experience', 0),
+                    filename=filename,
+                    resume_url=resume_url(document)
+                ))
                 
         except Exception as e:
-            logger.error(f"Error processing {filename}: {str(e)}", exc_info=True)
-            print(f"Error processing {filename}: {str(e)}")
+            logger.error("Error processing %s: %s", filename, e, exc_info=True)
             continue
     
     logger.info(f"Processing complete. Found {len(results)} matches")
-    return sorted(results, key=lambda x: x['score'], reverse=True)
+    return sorted(results, key=lambda x: x.score, reverse=True)
 
 def process_resume(filepath: str, requirements: Dict[str, Any]) -> Dict[str, Any]:
     """Complete resume processing pipeline"""
@@ -1,24 +1,41 @@
 import os
 import re
 import json
+import asyncio
 import logging
 from typing import List, Dict, Optional
 from django.shortcuts import render, redirect, Http404
+from django.urls import reverse
 from django.http import JsonResponse, FileResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from celery.result import AsyncResult
-from dotenv import load_dotenv
-import google.generativeai as genai
 from .forms import JobRequirementForm
 from django.contrib.auth.decorators import login_required
 from .forms import EmailConfigurationForm
-from .models import EmailConfiguration
+from .models import EmailConfiguration, MatchResult, ResumeDocument
+from .metrics import timed, render_prometheus
+from .async_utils import run_io, run_cpu
+from .catalog import iter_resumes, absolute_path, resume_url
+from .text_cache import get_resume_text
+from .text_store import UNNORMALIZED_BYTES_RE, prefilter_documents, store_form, stored_text
+from .dedup import collapse_candidates
+from .results import CandidateResult, ResultsResponse, SkillVocabulary
+from .cascade import REFINE, ScoreCascade, experience_points, search_cutoff
+from .extractors import get_extractor
+from .profiles import cached_profile, get_profile
 from django.contrib import messages
 from .utils import get_email_config
 from .models import Candidate
-from .tasks import process_resumes_from_email, fetch_resumes_from_email
+from celery import chord
+from .tasks import (
+    process_resumes_from_email,
+    fetch_resumes_from_email,
+    generate_pdf_report,
+    sync_mailbox,
+    ingest_synced_resumes
+)
 from .utils import (
     extract_text_from_resume,
     extract_name_from_resume,
@@ -28,19 +45,12 @@ from .utils import (
     get_resume_files,
     test_email_connection,
     extract_email_from_resume,  # Add this
-    extract_phone  
+    extract_phone
 )
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-load_dotenv()
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    raise ValueError("Missing GEMINI_API_KEY environment variable")
-genai.configure(api_key=GEMINI_API_KEY)
-
 # ====================== Core Views ====================== #
 def index(request):
     return render(request, 'hrapp/index.html')
@@ -60,43 +70,40 @@ def resume_matcher_view(request):
         skills_input = request.POST.get('skills_to_find', '')
         min_experience = int(request.POST.get('min_experience', 0))
         skills_to_find = [skill.strip() for skill in skills_input.split(',') if skill.strip()]
+        job_requirements = {
+            'required_skills': skills_to_find,
+            'min_experience': min_experience,
+            'job_title_keywords': [job_title.lower()] if job_title else []
+        }
+        # Same cascade as match_resumes: the extractor is only called for borderline resumes
+        cascade = ScoreCascade(cutoff=search_cutoff(job_title), min_experience=min_experience)
 
-        resume_dir = os.path.join(settings.MEDIA_ROOT, 'resumes')
-        
-        for filename in os.listdir(resume_dir):
-            if filename.lower().endswith(('.pdf', '.docx')):
-                resume_path = os.path.join(resume_dir, filename)
-                
-                try:
-                    text = extract_text_from_resume(resume_path)
-                    if not text:
-                        continue
-
-                    # Try Gemini first, fallback to direct search
-                    candidate_data = extract_skills_with_gemini(text, skills_to_find)
-                    experience = candidate_data['experience']
-                    
-                    score = calculate_ats_score(
-                        resume_text=text,
-                        job_requirements={
-                            'required_skills': skills_to_find,
-                            'min_experience': min_experience,
-                            'job_title_keywords': [job_title.lower()] if job_title else []
-                        }
-                    )
-
-                    if score['total_score'] > 0 and experience >= min_experience:
-                        matched_candidates.append({   'name': candidate_data['name'],
-                            'score': score['total_score'],
-                            'path': os.path.join(settings.MEDIA_URL, 'resumes', f'user_{request.user.id}', filename).replace('\\', '/'),
-                            'matched_skills': score['matched_skills'],
-                            'experience': experience
-                        })
-                        
-                except Exception as e:
-                    logger.error(f"Error processing {filename}: {str(e)}")
+        for document in iter_resumes(request.user.id):
+            filename = document.filename
+            
+            try:
+                stored = stored_text(document)
+                if stored is None:
                     continue
 
+                score = calculate_ats_score_stored(stored, job_requirements)
+                if score['total_score'] <= 0:
+                    continue
+                candidate_data = cascade_profile(document, score, skills_to_find, cascade)
+                experience = candidate_data['experience']
+
+                if experience >= min_experience:
+                    matched_candidates.append({   'name': candidate_data['name'],
+                        'score': score['total_score'],
+                        'path': resume_url(document),
+                        'matched_skills': score['matched_skills'],
+                        'experience': experience
+                    })
+                    
+            except Exception as e:
+                logger.error(f"Error processing {filename}: {str(e)}")
+                continue
+
         matched_candidates.sort(key=lambda x: x['score'], reverse=True)
     
     return render(request, 'hrapp/resume_matcher.html', {
@@ -105,9 +112,16 @@ def resume_matcher_view(request):
 
 @require_POST
 @csrf_exempt 
-def match_resumes(request):
+async def match_resumes(request):
+    """
+    Async search: the IMAP fetch and Gemini calls are awaited, parsing and
+    scoring run on the CPU pool (hrapp.async_utils), so a slow mailbox or
+    LLM doesn't tie up an ASGI worker
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
     try:
-        
         #accessing resumes from the email 
         # First fetch new resumes from email with date filtering
         from .tasks import fetch_resumes_from_email
@@ -121,7 +135,7 @@ def match_resumes(request):
         
         # Pass date filters to the email fetching task if they are provided
         if date_filtering_applied:
-            resume_files = fetch_resumes_from_email(request.user.id, date_from, date_to)
+            resume_files = await run_io(fetch_resumes_from_email, user.id, date_from, date_to)
             logger.info(f"Date filtering applied: from={date_from}, to={date_to}")
             
             # If date filtering is applied and no new emails found, return empty results
@@ -129,7 +143,7 @@ def match_resumes(request):
                 logger.info("No new resumes found in email for the specified date range")
                 return JsonResponse([], safe=False)
         else:
-            resume_files = fetch_resumes_from_email(request.user.id)
+            resume_files = await run_io(fetch_resumes_from_email, user.id)
             logger.info("No date filtering applied - processing all emails")
         
         if not resume_files and not date_filtering_applied:
@@ -139,65 +153,132 @@ def match_resumes(request):
         skills = [s.strip().lower() for s in request.POST.get('skills', '').split(',') if s.strip()]
         min_experience = int(request.POST.get('min_experience', 0))
         position = request.POST.get('position', '').lower()
+        job_requirements = {
+            'required_skills': skills,
+            'min_experience': min_experience,
+            'job_title_keywords': [position],
+            'preferred_skills': []
+        }
         
-        resume_dir = os.path.join(settings.MEDIA_ROOT, 'resumes')
         results = []
         
-        # Only process existing resumes if no date filtering is applied OR if new emails were found
+        # Only process existing resumes if no date filtering is applied OR if new emails were found.
+        # Only this user's resumes are listed, from the catalog; copies of
+        # the same resume (renamed, re-sent, re-saved) are grouped there and
+        # scored once, and text comes from the per-user text cache
         if not date_filtering_applied or resume_files:
-            for filename in os.listdir(resume_dir):
-                if filename.lower().endswith(('.pdf', '.docx')):
-                    filepath = os.path.join(resume_dir, filename)
-                    
-                    try:
-                        text = extract_text_from_resume(filepath)
-                        if not text:
-                            continue
-                            
-                        # Use Gemini with fallback
-                        candidate_data = extract_skills_with_gemini(text, skills)
-                        
-                        ats_score = calculate_ats_score(
-                            resume_text=text,
-                            job_requirements={
-                                'required_skills': skills,
-                                'min_experience': min_experience,
-                                'job_title_keywords': [position],
-                                'preferred_skills': []
-                            }
-                        )
-                        if ats_score['matched_skills']:  # This checks if the list is not empty
-                            results.append({
-                                'name': candidate_data['name'],
-                                'score': ats_score['total_score'],
-                                'matched_skills': ats_score['matched_skills'],
-                                'missing_skills': ats_score['missing_skills'],
-                                'experience': candidate_data['experience'],
-                                #'email': candidate_data.get('email', ''),
-                                #'phone': candidate_data.get('phone', ''),
-                                'email': candidate_data['email'],
-                                'phone': candidate_data['phone'],
-                                
-                                
-                                'filename': filename,
-                                'resume_url': os.path.join(settings.MEDIA_URL, 'resumes', filename).replace('\\', '/'),
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing {filename}: {str(e)}")
-                        continue
+            documents = await run_io(lambda: list(iter_resumes(user.id)))
+            # Resumes whose trigram signature rules out every required skill are never opened
+            documents = await run_cpu(prefilter_documents, documents, skills)
+            llm_slots = asyncio.Semaphore(getattr(settings, 'LLM_CONCURRENCY', 8))
+            vocabulary = SkillVocabulary(skills)
+            # Gemini is only asked for the fields of resumes near the position's min_score
+            cutoff = await run_io(search_cutoff, position)
+            cascade = ScoreCascade(cutoff=cutoff, min_experience=min_experience)
+            scored = await asyncio.gather(*(
+                score_resume_async(document, skills, job_requirements, llm_slots, vocabulary, cascade)
+                for document in documents
+            ))
+            results = [row for row in scored if row is not None]
         
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return JsonResponse(results, safe=False)
+        results.sort(key=lambda x: x.score, reverse=True)
+        results = collapse_candidates(results)
+
+        # Persist the ranking so exports can be served by ID, without the
+        # browser posting the candidates back
+        match_result = await MatchResult.objects.acreate(
+            user=user,
+            position=position,
+            skills=', '.join(skills),
+            min_experience=min_experience
+        )
+        await run_io(match_result.save_candidates, results)
+
+        response = ResultsResponse(results)
+        response['X-Match-Result-Id'] = str(match_result.id)
+        return response
         
     except Exception as e:
         logger.error(f"Match resumes error: {str(e)}", exc_info=True)
         return JsonResponse({'error': str(e)}, status=500)
 
+
+async def score_resume_async(document, skills, job_requirements, llm_slots, vocabulary=None, cascade=None):
+    """Score one catalogued resume for match_resumes (None if it doesn't match)"""
+    vocabulary = vocabulary or SkillVocabulary(skills)
+    cascade = cascade or ScoreCascade(min_experience=job_requirements.get('min_experience', 0))
+    filename = document.filename
+    try:
+        # Scored on the mapped text store first: resumes without a single
+        # required skill are dropped before their text is loaded or sent to Gemini
+        stored = await run_cpu(stored_text, document)
+        if stored is None:
+            return None
+        ats_score = await run_cpu(calculate_ats_score_stored, stored, job_requirements)
+        if not ats_score['matched_skills']:  # This checks if the list is not empty
+            return None
+        if cascade.decide(ats_score) == REFINE:
+            # An LLM profile from prewarming answers without a call; otherwise
+            # the LLM extractor (with fallback) reads the resume. The ATS score
+            # stays the one it is ranked by, and the row is kept either way
+            candidate_data = await run_cpu(cached_profile, document, 'llm')
+            if candidate_data is None:
+                text = await run_cpu(get_resume_text, document)
+                async with llm_slots:
+                    candidate_data = await get_extractor('interactive').aextract(text, skills)
+        else:
+            # Usually warmed by prewarm_resumes right after ingest
+            candidate_data = await run_cpu(get_profile, document)
+    except Exception as e:
+        logger.error(f"Error processing {filename}: {str(e)}")
+        return None
+
+    return CandidateResult(
+        name=candidate_data['name'],
+        score=ats_score['total_score'],
+        matched_skills=vocabulary.as_tuple(ats_score['matched_skills']),
+        missing_skills=vocabulary.as_tuple(ats_score['missing_skills']),
+        experience=candidate_data['experience'],
+        email=candidate_data['email'],
+        phone=candidate_data['phone'],
+        filename=filename,
+        resume_url=resume_url(document),
+    )
+
+def cascade_profile(document, ats_score: dict, skills: List[str], cascade: ScoreCascade) -> dict:
+    """Candidate fields for a scored resume, from the LLM only if the cascade refines it (synchronous views)"""
+    if cascade.decide(ats_score) != REFINE:
+        return get_profile(document)
+    candidate_data = cached_profile(document, 'llm')
+    if candidate_data is None:
+        candidate_data = get_extractor('interactive').extract(get_resume_text(document) or '', skills)
+    return candidate_data
+
 # ====================== Utility Functions ====================== #
+EXPERIENCE_PATTERN = r'(\d+)\s*(?:years?|yrs?)(?:\s*\+?)?\s*(?:experience|exp)'
+EXPERIENCE_RE = re.compile(EXPERIENCE_PATTERN)
+EXPERIENCE_BYTES_RE = re.compile(EXPERIENCE_PATTERN.encode())
+
+
+@timed('ats_score')
 def calculate_ats_score(resume_text: str, job_requirements: dict) -> dict:
     """Enhanced ATS scoring with position matching"""
     resume_lower = resume_text.lower()
+    return ats_score(resume_lower, EXPERIENCE_RE.search(resume_lower), job_requirements)
+
+
+@timed('ats_score')
+def calculate_ats_score_stored(stored, job_requirements: dict) -> dict:
+    """calculate_ats_score on a text_store.StoredText, searched in place without decoding"""
+    exp_match = stored.search(EXPERIENCE_BYTES_RE)
+    if exp_match is None and stored.search(UNNORMALIZED_BYTES_RE):
+        # Stored before store_form: Unicode spaces/digits need the str pattern
+        exp_match = EXPERIENCE_RE.search(store_form(stored.decode()))
+    return ats_score(stored, exp_match, job_requirements)
+
+
+def ats_score(resume_lower, exp_match, job_requirements: dict) -> dict:
+    """Scores for lowercased resume text (anything supporting `in`) and its experience match"""
     scores = {
         'total_score': 0,
         'skill_match': 0,
@@ -217,10 +298,8 @@ def calculate_ats_score(resume_text: str, job_requirements: dict) -> dict:
     
     # Experience Matching (30 points)
     min_exp = job_requirements.get('min_experience', 0)
-    exp_match = re.search(r'(\d+)\s*(?:years?|yrs?)(?:\s*\+?)?\s*(?:experience|exp)', resume_lower)
     if exp_match:
-        resume_exp = float(exp_match.group(1))
-        scores['experience_match'] = min(30, (resume_exp / min_exp) * 30) if min_exp > 0 else 0
+        scores['experience_match'] = experience_points(float(exp_match.group(1)), min_exp)
     
     # Position Matching (20 points)
     position_keywords = [kw.lower() for kw in job_requirements.get('job_title_keywords', [])]
@@ -230,50 +309,18 @@ def calculate_ats_score(resume_text: str, job_requirements: dict) -> dict:
     scores['total_score'] = sum(scores[k] for k in ['skill_match', 'experience_match', 'title_match'])
     return scores
 
-def extract_skills_with_gemini(resume_text: str, searched_skills: List[str]) -> Dict[str, any]:
-    """Strict resume parser using Gemini AI with fallback"""
-    try:
-        model = genai.GenerativeModel('gemini-1.5-pro')
-        prompt = f"""Extract from resume as JSON:
-{{
-    "name": "Full Name",
-    "email": "email@example.com",
-    "phone": "+1234567890",
-    "skills": ["only", "requested", "skills"],
-    "experience": years
-}}
-Skills to match: {searched_skills}"""
-        response = model.generate_content(prompt)
-        data = json.loads(response.text)
-        
-        return {
-            "name": data.get("name", "Unknown").title(),
-            "email": data.get("email", ""),
-            "phone": data.get("phone", ""),
-            "skills": [s.lower() for s in data.get("skills", []) if s.lower() in {sk.lower() for sk in searched_skills}],
-            "experience": float(data.get("experience", 0)),
-            "source": "Gemini"
-        }
-    except Exception:
-        return extract_direct_search_fallback(resume_text, searched_skills)
-
-def extract_direct_search_fallback(resume_text: str, searched_skills: List[str]) -> Dict[str, any]:
-    """Fallback skill extractor"""
-    text_lower = resume_text.lower()
-    return {
-        "name": extract_name_from_resume(resume_text),
-        "email": extract_email_from_resume(resume_text),
-        "phone": extract_phone(resume_text),
-        "skills": [s for s in searched_skills if re.search(rf'\b{re.escape(s.lower())}\b', text_lower)],
-        "experience": extract_experience(resume_text),
-        "source": "DirectSearch"
-    }
-
 # ====================== Additional Views ====================== #
+@login_required
 def view_resume(request, filename):
     # Normalize filename (handle spaces and special chars)
     clean_name = os.path.basename(filename).replace('%20', ' ')
-    filepath = os.path.normpath(os.path.join(settings.MEDIA_ROOT, 'resumes', clean_name))
+    document = ResumeDocument.objects.filter(
+        user_id=request.user.id, filename=clean_name, duplicate_of__isnull=True
+    ).first()
+    if document is not None:
+        filepath = os.path.normpath(absolute_path(document.path))
+    else:
+        filepath = os.path.normpath(os.path.join(settings.MEDIA_ROOT, 'resumes', clean_name))
     
     # Security check - prevent directory traversal
     if not filepath.startswith(os.path.normpath(os.path.join(settings.MEDIA_ROOT, 'resumes'))):
@@ -292,12 +339,13 @@ def view_resume(request, filename):
         print(f"Error opening file: {str(e)}")
         raise Http404("Could not open file")
 
+@login_required
 def upload_requirement(request):
     if request.method == 'POST':
         form = JobRequirementForm(request.POST)
         if form.is_valid():
             job_req = form.save()
-            process_resumes_from_email.delay(job_req.id)
+            process_resumes_from_email.delay(job_req.id, request.user.id)
             return redirect('dashboard')
     else:
         form = JobRequirementForm()
@@ -309,21 +357,48 @@ def dashboard(request):
         'matched_candidates': matched_candidates
     })
 
+@login_required
 def fetch_resumes(request):
     try:
-        task = fetch_resumes_from_email.delay()
+        # Same path as the scheduled sync: capped per mail server, then ingest
+        task = chord([sync_mailbox.s(request.user.id)])(ingest_synced_resumes.s())
         return JsonResponse({'status': 'started', 'task_id': task.id})
     except Exception as e:
         return JsonResponse({'status': 'error', 'error': str(e)}, status=500)
     
     
-from .export_utils import export_to_excel, export_to_pdf
+from .export_utils import (
+    export_to_excel,
+    export_to_pdf,
+    export_to_csv,
+    export_to_arrow,
+    iter_job_candidates,
+    file_download_response,
+    get_export_dir,
+    PDF_BACKGROUND_THRESHOLD
+)
 
 from django.views.decorators.csrf import csrf_exempt
 
 from django.http import HttpResponseBadRequest
 
-def export_results(request, format_type):
+async def export_results(request, format_type):
+    # Rendering (and, for Excel, writing the workbook) runs on the I/O pool
+    # so a large export doesn't hold up the event loop
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    # Stored results for a job can be exported directly, no candidates payload needed
+    job_id = request.GET.get('job_id') or request.POST.get('job_id')
+    if job_id:
+        try:
+            return await run_io(
+                render_export, request, format_type, iter_job_candidates(job_id, user.id),
+                filename=f"job_{job_id}_candidates", job_id=job_id, streaming=True
+            )
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
     if request.method == 'POST':
         try:
             if not request.POST.get('candidates'):
@@ -337,17 +412,94 @@ def export_results(request, format_type):
                     elif not candidate.get(field):
                         candidate[field] = []
 
-            if format_type == 'excel':
-                return export_to_excel(candidates)
-            elif format_type == 'pdf':
-                return export_to_pdf(candidates)
-            else:
-                return HttpResponseBadRequest("Invalid format")
+            return await run_io(
+                render_export, request, format_type, candidates,
+                streaming=request.POST.get('stream') == '1'
+            )
                 
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
     return HttpResponseBadRequest("Invalid request method")
 
+
+async def export_match_result(request, format_type, result_id):
+    """Export a stored search straight from the database"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    # Only the owner's results; any other ID looks the same as a missing one
+    match_result = await MatchResult.objects.filter(id=result_id, user_id=user.id).afirst()
+    if match_result is None:
+        raise Http404("Match result not found")
+
+    try:
+        return await run_io(
+            render_export, request, format_type, match_result.iter_candidates(),
+            filename=f"match_{result_id}_candidates", result_id=result_id, streaming=True
+        )
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def render_export(request, format_type, candidates, filename="matching_candidates",
+                  job_id=None, result_id=None, streaming=False):
+    """Dispatch to the exporter for `format_type` (excel, pdf, csv, parquet, arrow)"""
+    if format_type == 'excel':
+        return export_to_excel(candidates, filename=filename, streaming=streaming)
+    elif format_type == 'pdf':
+        candidates = list(candidates)
+        if len(candidates) > PDF_BACKGROUND_THRESHOLD:
+            if result_id:
+                return start_pdf_report(request, result_id=result_id, filename=filename)
+            if job_id:
+                return start_pdf_report(request, job_id=job_id, filename=filename)
+            return start_pdf_report(request, candidates=candidates, filename=filename)
+        return export_to_pdf(candidates, filename=filename)
+    elif format_type == 'csv':
+        return export_to_csv(candidates, filename=filename)
+    elif format_type in ('parquet', 'arrow'):
+        return export_to_arrow(candidates, filename=filename, file_format=format_type)
+    else:
+        return HttpResponseBadRequest("Invalid format")
+
+
+def start_pdf_report(request, **task_kwargs):
+    """Queue a big PDF report and hand back a URL to poll for the download link"""
+    task = generate_pdf_report.delay(user_id=request.user.id, **task_kwargs)
+    return JsonResponse({
+        'status': 'started',
+        'task_id': task.id,
+        'status_url': reverse('export_status', args=[task.id])
+    }, status=202)
+
+
+@login_required
+def export_status(request, task_id):
+    result = AsyncResult(task_id)
+    if result.successful():
+        if result.result.get('user_id') != request.user.id:
+            raise Http404("Report not found")
+        return JsonResponse({
+            'status': 'completed',
+            'download_url': reverse('download_export', args=[result.result['filename']])
+        })
+    if result.failed():
+        return JsonResponse({'status': 'failed', 'error': str(result.result)}, status=500)
+    return JsonResponse({'status': result.state.lower()})
+
+
+@login_required
+def download_export(request, filename):
+    # Reports are written to their owner's directory, so only theirs can be served
+    export_dir = os.path.normpath(get_export_dir(request.user.id))
+    filepath = os.path.normpath(os.path.join(export_dir, os.path.basename(filename)))
+
+    # Security check - prevent directory traversal
+    if not filepath.startswith(export_dir) or not os.path.exists(filepath):
+        raise Http404("Report not found")
+
+    return file_download_response(open(filepath, 'rb'), os.path.basename(filepath), 'application/pdf')
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect
 from django.contrib import messages
@@ -421,9 +573,27 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def check_mail_login(protocol, host, port, username, password, use_tls):
+    """Log in to an IMAP or SMTP server; raises on any failure"""
+    if protocol == 'IMAP':
+        with imaplib.IMAP4_SSL(host, port, timeout=10) as imap:
+            imap.login(username, password)
+            status, _ = imap.select('INBOX')
+    else:
+        if use_tls:
+            with smtplib.SMTP_SSL(host, port, timeout=10) as smtp:
+                smtp.login(username, password)
+        else:
+            with smtplib.SMTP(host, port, timeout=10) as smtp:
+                smtp.starttls()
+                smtp.login(username, password)
+
+
 @require_POST
-def test_email_connection(request):
+async def test_email_connection(request):
     """Test email server connection with user-provided settings"""
+    import socket
+
     try:
         # Debug: Log all POST data (excluding password)
         safe_post_data = {k: v for k, v in request.POST.items() if k != 'email_password'}
@@ -484,10 +654,9 @@ def test_email_connection(request):
 
         # Test connection with better error handling
         try:
-            # First test DNS resolution
-            import socket
+            # First test DNS resolution (the event loop's resolver, not a blocking call)
             try:
-                socket.gethostbyname(host)
+                await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
             except socket.gaierror:
                 return JsonResponse({
                     'success': False,
@@ -495,18 +664,7 @@ def test_email_connection(request):
                 }, status=400)
                 
             # Now test the actual connection
-            if protocol == 'IMAP':
-                with imaplib.IMAP4_SSL(host, port, timeout=10) as imap:
-                    imap.login(username, password)
-                    status, _ = imap.select('INBOX')
-            else:
-                if use_tls:
-                    with smtplib.SMTP_SSL(host, port, timeout=10) as smtp:
-                        smtp.login(username, password)
-                else:
-                    with smtplib.SMTP(host, port, timeout=10) as smtp:
-                        smtp.starttls()
-                        smtp.login(username, password)
+            await run_io(check_mail_login, protocol, host, port, username, password, use_tls)
 
             logger.info(f"Connection to {host} successful!")
             return JsonResponse({
@@ -569,6 +727,15 @@ def logout_view(request):
     return redirect('login')
      
 
+def metrics_view(request):
+    """Prometheus scrape endpoint for the in-process pipeline metrics (METRICS_TOKEN bearer or staff)"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorized = bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+    if not authorized and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponse(status=401 if token else 403)
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def root_redirect(request):
     """Handle root URL redirection"""
     if request.user.is_authenticated:
@@ -0,0 +1,116 @@
+# hrapp/work_history.py
+"""
+Work-history date range parser.
+
+Finds employment ranges such as "Jan 2019 - Mar 2021", "Sept. 2020 to
+Present" or "03/2018 – 11/2019", resolves the dates with a fixed month
+table and merges overlapping ranges, so concurrent jobs are not counted
+twice. Only English month names and abbreviations start a word date, so
+"Company 2019 - Present" is not a range; dateparser is only consulted
+when parse_month_year is given another word (e.g. "Janvier 2020").
+"""
+import re
+from datetime import date
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+MONTHS = {
+    'jan': 1, 'january': 1,
+    'feb': 2, 'february': 2,
+    'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4,
+    'may': 5,
+    'jun': 6, 'june': 6,
+    'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12,
+}
+
+ONGOING = r"present|now|current|currently|till\s+date|to\s+date|date|ongoing"
+
+MONTH_PATTERN = r"(?<![A-Za-zÀ-ſ])(?:" + '|'.join(sorted(MONTHS, key=len, reverse=True)) + r")(?![A-Za-zÀ-ſ])"
+
+_DATE = rf"(?:{MONTH_PATTERN}\.?,?\s*'?\d{{4}}|\d{{1,2}}\s*[/.-]\s*\d{{4}})"
+
+RANGE_RE = re.compile(
+    rf"(?P<start>{_DATE})\s*(?:-|–|—|to|till|until)\s*(?P<end>{_DATE}|{ONGOING})",
+    re.IGNORECASE
+)
+WORD_DATE_RE = re.compile(r"([A-Za-zÀ-ſ]+)\.?,?\s*'?(\d{4})")
+NUMERIC_DATE_RE = re.compile(r"(\d{1,2})\s*[/.-]\s*(\d{4})")
+ONGOING_RE = re.compile(rf"^(?:{ONGOING})$", re.IGNORECASE)
+
+# (year, month) as a single month index
+MonthIndex = int
+
+
+def _month_index(year: int, month: int) -> MonthIndex:
+    return year * 12 + (month - 1)
+
+
+@lru_cache(maxsize=512)
+def _dateparser_fallback(token: str) -> Optional[MonthIndex]:
+    try:
+        import dateparser
+    except ImportError:
+        return None
+    parsed = dateparser.parse(token, settings={'REQUIRE_PARTS': ['month', 'year']})
+    return _month_index(parsed.year, parsed.month) if parsed else None
+
+
+def parse_month_year(token: str, today: Optional[date] = None) -> Optional[MonthIndex]:
+    """Month index for "Mar 2021", "March, 2021", "03/2021" or "Present" (None if unknown)"""
+    token = token.strip()
+    if ONGOING_RE.match(token):
+        today = today or date.today()
+        return _month_index(today.year, today.month)
+
+    if match := NUMERIC_DATE_RE.fullmatch(token):
+        month, year = int(match.group(1)), int(match.group(2))
+        return _month_index(year, month) if 1 <= month <= 12 else None
+
+    if match := WORD_DATE_RE.fullmatch(token):
+        word, year = match.group(1).lower(), int(match.group(2))
+        if word in MONTHS:
+            return _month_index(year, MONTHS[word])
+        # Month names in another language (never from RANGE_RE, which only takes English ones)
+        return _dateparser_fallback(token)
+
+    return None
+
+
+def extract_work_periods(text: str, today: Optional[date] = None) -> List[Tuple[MonthIndex, MonthIndex]]:
+    """All (start, end) month-index ranges found in the text, unmerged"""
+    today = today or date.today()
+    now = _month_index(today.year, today.month)
+    periods = []
+    for match in RANGE_RE.finditer(text):
+        start = parse_month_year(match.group('start'), today)
+        end = parse_month_year(match.group('end'), today)
+        if start is None or end is None:
+            continue
+        end = min(end, now)
+        if end > start:
+            periods.append((start, end))
+    return periods
+
+
+def merge_periods(periods: List[Tuple[MonthIndex, MonthIndex]]) -> List[Tuple[MonthIndex, MonthIndex]]:
+    """Union of possibly overlapping ranges"""
+    merged = []
+    for start, end in sorted(periods):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def total_experience_years(text: str, today: Optional[date] = None) -> float:
+    """Years covered by the union of all employment ranges, to one decimal"""
+    months = sum(end - start for start, end in merge_periods(extract_work_periods(text, today)))
+    return round(months / 12, 1)
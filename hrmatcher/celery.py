@@ -6,4 +6,22 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hrmatcher.settings')
 
 app = Celery('hrmatcher')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+def worker_argv(queue, concurrency=None):
+    """`celery worker` arguments for one queue, with the pool configured in WORKER_POOLS"""
+    from django.conf import settings
+    pools = settings.WORKER_POOLS
+    if queue not in pools:
+        raise ValueError(f"Unknown queue {queue!r} (expected one of {', '.join(pools)})")
+    profile = pools[queue]
+    return [
+        'worker',
+        '--queues', queue,
+        '--hostname', f"{queue}@%h",
+        '--pool', profile['pool'],
+        '--concurrency', str(concurrency or profile['concurrency']),
+        '--prefetch-multiplier', str(profile['prefetch_multiplier']),
+        '--loglevel', 'INFO',
+    ]
@@ -1,6 +1,7 @@
 
 from pathlib import Path
 from celery.schedules import crontab  # Explicit import for crontab
+from kombu import Queue
 # At the top with other imports
 from logging.handlers import RotatingFileHandler
 import os
@@ -156,10 +157,16 @@ EMAIL_HOST_PASSWORD = env('EMAIL_PASSWORD')  # Loaded from .env
 
 # Path to save resumes
 RESUME_FILE_PATH = env('RESUME_FILE_PATH')
+
+# Bearer token for scraping /metrics; without one only staff users can read it
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+# Shared by every web and Celery worker process: IMAP connection slots
+# (hrapp.tasks.acquire_imap_slot) only cap a mail server across workers
+# if they all see the same cache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('CACHE_URL', default='redis://localhost:6379/1'),
     }
 }
 
@@ -189,15 +196,64 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'hrmatcher.wsgi.application'
+ASGI_APPLICATION = 'hrmatcher.asgi.application'
+
+# Async views (hrapp.async_utils): threads for blocking network calls,
+# threads for parsing/scoring (default: CPU count), and concurrent Gemini
+# calls per search
+ASYNC_IO_WORKERS = env.int('ASYNC_IO_WORKERS', default=64)
+ASYNC_CPU_WORKERS = env.int('ASYNC_CPU_WORKERS', default=0) or None
+LLM_CONCURRENCY = env.int('LLM_CONCURRENCY', default=8)
+# Points either side of the position's JobRequirement.min_score within which a resume's
+# candidate fields come from the LLM rather than its cached profile (hrapp.cascade)
+CASCADE_UNCERTAINTY_BAND = env.float('CASCADE_UNCERTAINTY_BAND', default=10.0)
+
+# Candidate field extractor per queue: regex, gemini, local, stub or a dotted path (hrapp.extractors).
+# "interactive" is used by the views; EXTRACTOR_BACKEND=stub runs everything offline
+EXTRACTOR_BACKEND = env('EXTRACTOR_BACKEND', default='gemini')
+EXTRACTOR_BACKENDS = {
+    'default': EXTRACTOR_BACKEND,
+    'interactive': env('INTERACTIVE_EXTRACTOR_BACKEND', default=EXTRACTOR_BACKEND),
+    'llm': env('LLM_QUEUE_EXTRACTOR_BACKEND', default=EXTRACTOR_BACKEND),
+}
+GEMINI_MODEL = env('GEMINI_MODEL', default='gemini-1.5-pro')
+# Resume text sent to model extractors is compacted to about this many tokens (hrapp.compaction)
+LLM_INPUT_TOKEN_BUDGET = env.int('LLM_INPUT_TOKEN_BUDGET', default=1500)
+LOCAL_LLM_MODEL_PATH = env('LOCAL_LLM_MODEL_PATH', default='')
+LOCAL_LLM_THREADS = env.int('LOCAL_LLM_THREADS', default=0) or None
 
 # settings.py
 CELERY_BEAT_SCHEDULE = {
-    'process-resumes-hourly': {
-        'task': 'hrapp.tasks.process_resumes_from_email',
-        'schedule': crontab(hour='*/1'),
-        'args': (0,),  # Will be updated in the task itself
+    # Fans out one sync job per EmailConfiguration (hrapp.tasks.sync_mailbox)
+    'sync-mailboxes-hourly': {
+        'task': 'hrapp.tasks.sync_all_mailboxes',
+        'schedule': crontab(minute=0),
+    },
+    # Stored searches are kept for MATCH_RESULT_RETENTION_DAYS (hrapp.tasks.purge_match_results)
+    'purge-match-results-daily': {
+        'task': 'hrapp.tasks.purge_match_results',
+        'schedule': crontab(minute=30, hour=3),
     }
 }
+MATCH_RESULT_RETENTION_DAYS = env.int('MATCH_RESULT_RETENTION_DAYS', default=30)
+
+# Mailbox sync: folders synced per mailbox, and how many connections one
+# mail server gets at a time (slots are kept in the default cache, which
+# must be shared between workers for the cap to be global)
+IMAP_SYNC_FOLDERS = env.list('IMAP_SYNC_FOLDERS', default=['INBOX'])
+IMAP_MAX_CONNECTIONS_PER_HOST = env.int('IMAP_MAX_CONNECTIONS_PER_HOST', default=4)
+IMAP_SLOT_TIMEOUT = 15 * 60
+IMAP_SLOT_RETRY_SECONDS = 10
+
+# After ingest, hrapp.tasks.prewarm_resumes fills the text cache, text
+# store and profiles on its own queue, at the lowest Redis priority (0 is
+# highest), so it only runs when interactive work is idle. LLM profiles
+# are optional as they cost a model call per resume (enrich_resume_profiles,
+# on the llm queue at the same priority)
+PREWARM_ENABLED = env.bool('PREWARM_ENABLED', default=True)
+PREWARM_QUEUE = env('PREWARM_QUEUE', default='prewarm')
+PREWARM_PRIORITY = env.int('PREWARM_PRIORITY', default=9)
+PREWARM_LLM_ENRICHMENT = env.bool('PREWARM_LLM_ENRICHMENT', default=False)
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -278,6 +334,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Extracted resume text, one user_<id> partition per recruiter (hrapp.text_cache)
+RESUME_TEXT_CACHE_DIR = env('RESUME_TEXT_CACHE_DIR', default=os.path.join(BASE_DIR, 'text_cache'))
+
+# Lowercased resume text in one memory-mapped file per user, scanned by the matchers (hrapp.text_store)
+RESUME_TEXT_STORE_DIR = env('RESUME_TEXT_STORE_DIR', default=os.path.join(BASE_DIR, 'text_store'))
+
 
 # Celery Settings
 
@@ -286,6 +348,43 @@ CELERY_RESULT_BACKEND = 'django-db'
 CELERY_TIMEZONE = 'UTC'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Honour per-message priorities on Redis (used by the prewarm queue)
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+# One queue per kind of work, each served by its own worker (see
+# WORKER_POOLS), so a backlog of slow parsing never holds up mailbox sync
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'hrapp.tasks.sync_all_mailboxes': {'queue': 'sync'},
+    'hrapp.tasks.sync_mailbox': {'queue': 'sync'},
+    'hrapp.tasks.ingest_mailbox_uids': {'queue': 'sync'},
+    'hrapp.tasks.fetch_resumes_from_email': {'queue': 'sync'},
+    'hrapp.tasks.ingest_synced_resumes': {'queue': 'parse'},
+    'hrapp.tasks.ingest_user_resumes': {'queue': 'parse'},
+    'hrapp.tasks.process_resumes_from_email': {'queue': 'parse'},
+    'hrapp.tasks.prewarm_resumes': {'queue': PREWARM_QUEUE},
+    'hrapp.tasks.enrich_resume_profiles': {'queue': 'llm'},
+    'hrapp.tasks.generate_pdf_report': {'queue': 'export'},
+}
+
+# Worker pool per queue, started with `manage.py celery_worker <queue>`.
+# IMAP and model calls spend their time waiting on the network, so they run
+# on threads with high concurrency; parsing is CPU-bound and gets prefork
+# with one process per core. Prefetch 1 on long tasks keeps a busy worker
+# from sitting on messages an idle one could take
+WORKER_CPU_COUNT = env.int('WORKER_CPU_COUNT', default=os.cpu_count() or 1)
+WORKER_POOLS = {
+    'default': {'pool': 'prefork', 'concurrency': 2, 'prefetch_multiplier': 4},
+    'sync': {'pool': 'threads', 'concurrency': env.int('SYNC_WORKER_CONCURRENCY', default=32), 'prefetch_multiplier': 4},
+    'parse': {'pool': 'prefork', 'concurrency': WORKER_CPU_COUNT, 'prefetch_multiplier': 1},
+    'llm': {'pool': 'threads', 'concurrency': LLM_CONCURRENCY, 'prefetch_multiplier': 1},
+    'export': {'pool': 'prefork', 'concurrency': env.int('EXPORT_WORKER_CONCURRENCY', default=2), 'prefetch_multiplier': 1},
+    PREWARM_QUEUE: {'pool': 'prefork', 'concurrency': 1, 'prefetch_multiplier': 1},
+}
+CELERY_TASK_QUEUES = [Queue(name, routing_key=name) for name in WORKER_POOLS]
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True 
 SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
@@ -302,6 +401,8 @@ STATICFILES_DIRS = [
 ]
 
 # Adding Celery Result Model for tasks to be tracked
+# Records are handed to a queue on the calling thread; a background
+# listener does the console/file I/O so requests never block on logging.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -325,10 +426,14 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose'
         },
+        'queue': {
+            '()': 'hrapp.log_utils.QueueListenerHandler',
+            'handlers': ['console', 'file'],
+        },
     },
     'loggers': {
         '': {  # root logger
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
         },
         'your_app': {  # Replace 'your_app' with your actual app name
@@ -338,3 +443,6 @@ LOGGING = {
         },
     },
 }
+
+# Per-candidate debug logging (hrapp.log_utils.hot_log) keeps 1 record in N
+HOT_PATH_LOG_SAMPLE_RATE = 100